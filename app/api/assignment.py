@@ -0,0 +1,63 @@
+import os
+import numpy as np
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from typing import Dict, Any, List, Union
+from ..core.assignment import ClusterModel, ModelStore
+from ..core.instrumentation import stage
+from ..models.datasets import get_dataset
+from .results import get_cluster_results
+
+
+model_store = ModelStore(os.getenv("MODEL_DIR", "model_store"))
+
+
+class AssignRequest(BaseModel):
+    """Points to label, either as {feature: value} objects or as lists in feature-column order."""
+    points: List[Union[Dict[str, float], List[float]]]
+
+
+def fit_model(dataset: str, db: Session, eps: float = None, min_samples: int = None) -> Dict[str, Any]:
+    """Fits the dataset (reusing a cached result when possible) and persists the model."""
+    result, cache = get_cluster_results(dataset, db, eps, min_samples)
+    model = ClusterModel.from_result(result, data_version=cache['data_version'])
+    model_store.put(dataset, model)
+    return model.summary()
+
+
+def _feature_matrix(points: List[Union[Dict[str, float], List[float]]], feature_columns: List[str]) -> np.ndarray:
+    rows = []
+    for i, point in enumerate(points):
+        if isinstance(point, dict):
+            missing = [col for col in feature_columns if col not in point]
+            if missing:
+                raise ValueError(f"Point {i} is missing features: {', '.join(missing)}")
+            rows.append([point[col] for col in feature_columns])
+        else:
+            if len(point) != len(feature_columns):
+                raise ValueError(f"Point {i} has {len(point)} values, expected {len(feature_columns)} ({', '.join(feature_columns)})")
+            rows.append(point)
+    return np.array(rows, dtype=np.float64).reshape(len(rows), len(feature_columns))
+
+
+def assign_points(dataset: str, db: Session, request: AssignRequest) -> Dict[str, Any]:
+    """
+    Labels new points against the persisted model. The model is fitted once
+    on first use; afterwards no feature queries run.
+    """
+    spec = get_dataset(dataset)
+    features = _feature_matrix(request.points, spec.feature_columns)
+    
+    model = model_store.get(dataset)
+    if model is None:
+        fit_model(dataset, db)
+        model = model_store.get(dataset)
+    
+    with stage('assign', spec.name):
+        labels, distances = model.predict(features)
+    
+    return {
+        'labels': labels.tolist(),
+        'distances': [float(d) if np.isfinite(d) else None for d in distances],
+        'model': model.summary()
+    }
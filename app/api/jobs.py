@@ -0,0 +1,250 @@
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional
+from pydantic import BaseModel
+from ..core.clustering import ClusterResult
+from ..core.instrumentation import metrics, set_stage_listener, reset_stage_listener
+from ..database import SessionLocal
+from ..models.datasets import get_dataset
+from .results import get_cluster_results
+from .sweep import parse_sweep_grid, run_sweep
+
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_LIMIT = int(os.getenv("JOB_QUEUE_LIMIT", "16"))
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", "100"))
+
+# How often the event stream looks for new events, and how long it may stay silent
+EVENT_POLL_SECONDS = 0.25
+EVENT_KEEPALIVE_SECONDS = 15.0
+
+FINISHED_STATES = ('succeeded', 'failed', 'cancelled')
+
+
+class JobRequest(BaseModel):
+    """
+    A clustering fit, or a parameter sweep when kind is 'sweep'. Fits use
+    eps and min_samples (optimized when omitted); sweeps use the grids, in
+    the same syntax as the sweep endpoint.
+    """
+    dataset: str
+    kind: Literal['fit', 'sweep'] = 'fit'
+    eps: Optional[float] = None
+    min_samples: Optional[int] = None
+    eps_grid: str = "0.3:3.0:0.1"
+    min_samples_grid: str = "2,3,4"
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class Job:
+    """State and progress events of one background job."""
+
+    def __init__(self, request: JobRequest):
+        self.id = uuid.uuid4().hex
+        self.request = request
+        self.status = 'queued'
+        self.stage: Optional[str] = None
+        self.cancel_requested = False
+        self.error: Optional[str] = None
+        self.result: Optional[ClusterResult] = None
+        self.sweep: Optional[Dict[str, Any]] = None
+        self.cache: Optional[Dict[str, Any]] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.future: Optional[Future] = None
+        self._events: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._emit('status', status='queued')
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def _emit(self, event: str, **data: Any) -> None:
+        with self._lock:
+            self._events.append({'id': len(self._events), 'event': event, 'time': time.time(), **data})
+
+    def events_since(self, start: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            return self._events[start:]
+
+    def on_stage(self, name: str, phase: str) -> None:
+        # Stage listener; cancellation takes effect at the next stage boundary or checkpoint
+        if self.cancel_requested:
+            raise JobCancelled(f"Job {self.id} was cancelled")
+        if phase == 'check':
+            return
+        if phase == 'start':
+            self.stage = name
+        self._emit('stage', stage=name, phase=phase)
+
+    def start(self) -> None:
+        self.status = 'running'
+        self.started_at = time.time()
+        self._emit('status', status='running')
+
+    def finish(self, status: str, error: str = None) -> None:
+        # Emit before switching status, so a stream that sees the job finished has the final event
+        self.error = error
+        self.finished_at = time.time()
+        self._emit('status', status=status, error=error)
+        self.status = status
+        metrics.inc('dbscan_jobs_total', dataset=get_dataset(self.request.dataset).name, status=status)
+
+    def summary(self) -> Dict[str, Any]:
+        end = self.finished_at or time.time()
+        summary = {
+            'id': self.id,
+            'dataset': self.request.dataset,
+            'kind': self.request.kind,
+            'request': self.request.model_dump(),
+            'status': self.status,
+            'stage': self.stage,
+            'cancel_requested': self.cancel_requested,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'elapsed_seconds': round(end - self.started_at, 3) if self.started_at else None,
+        }
+        if self.result is not None:
+            labels = self.result.labels
+            summary['result'] = {
+                'n_samples': len(labels),
+                'n_clusters': len(set(labels.tolist()) - {-1}),
+                'n_outliers': int((labels == -1).sum()),
+                'params': self.result.params,
+                'cache': self.cache,
+            }
+        elif self.sweep is not None:
+            summary['result'] = self.sweep
+        return summary
+
+
+class JobManager:
+    """
+    Runs clustering jobs on a bounded thread pool. At most queue_limit jobs
+    wait for a worker; further submissions are rejected until the queue
+    drains. Finished jobs are kept, oldest dropped first, up to history.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, queue_limit: int = JOB_QUEUE_LIMIT,
+                 history: int = JOB_HISTORY):
+        self.queue_limit = queue_limit
+        self.history = history
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._jobs: 'OrderedDict[str, Job]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, request: JobRequest) -> Job:
+        spec = get_dataset(request.dataset)
+        if request.kind == 'sweep':
+            parse_sweep_grid(request.eps_grid, request.min_samples_grid)
+
+        with self._lock:
+            if sum(job.status == 'queued' for job in self._jobs.values()) >= self.queue_limit:
+                metrics.inc('dbscan_jobs_total', dataset=spec.name, status='rejected')
+                raise JobQueueFull(f"Job queue is full ({self.queue_limit} jobs waiting)")
+            job = Job(request)
+            self._jobs[job.id] = job
+            self._prune()
+            job.future = self._executor.submit(self._run, job)
+        return job
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Job:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            raise KeyError(f"Unknown job: {job_id}")
+        return job
+
+    def cancel(self, job_id: str) -> Job:
+        """Cancels a queued job at once, a running one at its next stage boundary or checkpoint."""
+        job = self.get(job_id)
+        if not job.finished:
+            job.cancel_requested = True
+            if job.future.cancel():
+                job.finish('cancelled')
+        return job
+
+    def _run(self, job: Job) -> None:
+        job.start()
+        token = set_stage_listener(job.on_stage)
+        db = None
+        try:
+            db = SessionLocal()
+            request = job.request
+            if request.kind == 'sweep':
+                job.sweep = run_sweep(get_dataset(request.dataset), db, request.eps_grid, request.min_samples_grid)
+            else:
+                # Not coalesced: a cancelled job must not fail requests sharing its fit
+                job.result, job.cache = get_cluster_results(
+                    request.dataset, db, request.eps, request.min_samples, coalesce=False
+                )
+            job.finish('succeeded')
+        except JobCancelled:
+            job.finish('cancelled')
+        except Exception as e:
+            job.finish('failed', error=str(e))
+        finally:
+            reset_stage_listener(token)
+            if db is not None:
+                db.close()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            self.cancel(job.id)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+job_manager = JobManager()
+
+
+def _sse(event: Dict[str, Any]) -> str:
+    data = {key: value for key, value in event.items() if key not in ('id', 'event')}
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(data)}\n\n"
+
+
+async def job_events(job: Job, last_event_id: Optional[int] = None) -> AsyncIterator[str]:
+    """
+    Server-sent progress events of a job: status changes and stage
+    start/end. Resumes after last_event_id and ends once the job finishes.
+    """
+    position = 0 if last_event_id is None else last_event_id + 1
+    idle = 0.0
+    while True:
+        finished = job.finished
+        events = job.events_since(position)
+        for event in events:
+            yield _sse(event)
+        position += len(events)
+        if finished:
+            return
+        if events:
+            idle = 0.0
+        elif idle >= EVENT_KEEPALIVE_SECONDS:
+            yield ": keepalive\n\n"
+            idle = 0.0
+        await asyncio.sleep(EVENT_POLL_SECONDS)
+        idle += EVENT_POLL_SECONDS
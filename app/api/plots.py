@@ -0,0 +1,30 @@
+from sqlalchemy.orm import Session
+from ..core.cache import ResultCache
+from ..core.instrumentation import stage
+from ..core.optimization import KDistanceProfile, ParameterOptimizer
+from ..core.visualization import ClusterVisualizer
+from ..models.datasets import DatasetSpec
+
+
+k_distance_cache = ResultCache(maxsize=32)
+
+
+def get_k_distance_png(spec: DatasetSpec, db: Session, min_samples: int = None) -> bytes:
+    """
+    Renders the k-distance graph for a dataset, reusing a cached image while
+    the data version and k are unchanged. The features are only loaded on a
+    cache miss.
+    """
+    with stage('data_version', spec.name):
+        key = (spec.name, spec.data_version(db), min_samples)
+    png = k_distance_cache.get(key)
+    if png is None:
+        df = spec.load(db)
+        if min_samples is None:
+            min_samples = ParameterOptimizer.find_optimal_min_samples(len(df))
+        with stage('k_distance', spec.name):
+            profile = KDistanceProfile.compute(spec.analyzer().prepare(df), min_samples)
+        with stage('render', spec.name):
+            png = ClusterVisualizer.render_k_distance(profile, spec.name, min_samples)
+        k_distance_cache.set(key, png)
+    return png
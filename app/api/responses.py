@@ -0,0 +1,132 @@
+import importlib.util
+import json
+import math
+from fastapi import HTTPException, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Dict, Any, Iterator, Optional
+from ..core.clustering import ClusterResult
+
+
+RESPONSE_FORMATS = ('json', 'columnar', 'ndjson', 'arrow')
+NDJSON_CHUNK_ROWS = 1000
+
+
+class ResponseOptions:
+    """
+    Query parameters controlling how clustering results are serialized.
+
+    - format: json (default, row records), columnar, ndjson or arrow
+    - include_members: set to false to return only stats, params and outlier indices
+    - limit / offset: page through the member rows
+    """
+
+    def __init__(self, format: str = 'json', include_members: bool = True,
+                 limit: Optional[int] = None, offset: int = 0):
+        if format not in RESPONSE_FORMATS:
+            raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(RESPONSE_FORMATS)}")
+        if format == 'arrow' and importlib.util.find_spec('pyarrow') is None:
+            raise HTTPException(status_code=400, detail="format=arrow requires pyarrow to be installed")
+        if (limit is not None and limit < 0) or offset < 0:
+            raise HTTPException(status_code=400, detail="limit and offset must be non-negative")
+        self.format = format
+        self.include_members = include_members
+        self.limit = limit
+        self.offset = offset
+
+    @property
+    def paginated(self) -> bool:
+        return self.limit is not None or self.offset > 0
+
+    def page(self, n_rows: int) -> slice:
+        stop = n_rows if self.limit is None else min(n_rows, self.offset + self.limit)
+        return slice(min(self.offset, n_rows), stop)
+
+
+def _json_safe(value: Any) -> Any:
+    # NaN (e.g. the std of a single-member cluster) is not valid JSON; emit null like the json format
+    if isinstance(value, dict):
+        return {key: _json_safe(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_json_safe(item) for item in value]
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def _summary(result: ClusterResult, extra: Dict[str, Any], options: ResponseOptions) -> Dict[str, Any]:
+    page = options.page(len(result.frame))
+    return _json_safe(jsonable_encoder({
+        'total': len(result.frame),
+        'offset': page.start,
+        'limit': options.limit,
+        'outlier_indices': result.outlier_indices().tolist(),
+        'cluster_stats': result.cluster_stats,
+        **({'cluster_summary': result.cluster_summary} if result.cluster_summary is not None else {}),
+        'params': result.params,
+        **extra
+    }))
+
+
+def _render_json(result: ClusterResult, extra: Dict[str, Any], options: ResponseOptions) -> Dict[str, Any]:
+    if options.include_members and not options.paginated:
+        return {**result.to_dict(), **extra}
+
+    summary = _summary(result, extra, options)
+    if options.include_members:
+        summary[result.members_key] = result.frame.iloc[options.page(len(result.frame))].to_dict(orient='records')
+    return summary
+
+
+def _render_columnar(result: ClusterResult, extra: Dict[str, Any], options: ResponseOptions) -> Response:
+    content = _summary(result, extra, options)
+    if options.include_members:
+        page = result.frame.iloc[options.page(len(result.frame))]
+        content['columns'] = {col: page[col].tolist() for col in page.columns}
+    return JSONResponse(content=content)
+
+
+def _ndjson_lines(result: ClusterResult, summary: Dict[str, Any], options: ResponseOptions) -> Iterator[bytes]:
+    yield (json.dumps({'type': 'summary', 'columns': list(result.frame.columns), **summary}) + '\n').encode()
+    if not options.include_members:
+        return
+    page = result.frame.iloc[options.page(len(result.frame))]
+    for start in range(0, len(page), NDJSON_CHUNK_ROWS):
+        chunk = page.iloc[start:start + NDJSON_CHUNK_ROWS]
+        yield ''.join(json.dumps(list(row)) + '\n' for row in chunk.itertuples(index=False, name=None)).encode()
+
+
+def _render_ndjson(result: ClusterResult, extra: Dict[str, Any], options: ResponseOptions) -> Response:
+    summary = _summary(result, extra, options)
+    return StreamingResponse(_ndjson_lines(result, summary, options), media_type='application/x-ndjson')
+
+
+def _render_arrow(result: ClusterResult, extra: Dict[str, Any], options: ResponseOptions) -> Response:
+    import pyarrow as pa
+
+    summary = _summary(result, extra, options)
+    page = result.frame.iloc[options.page(len(result.frame))] if options.include_members else result.frame.iloc[0:0]
+    table = pa.Table.from_pandas(page, preserve_index=False)
+    table = table.replace_schema_metadata({'summary': json.dumps(summary)})
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return Response(content=sink.getvalue().to_pybytes(), media_type='application/vnd.apache.arrow.stream')
+
+
+RENDERERS = {
+    'json': _render_json,
+    'columnar': _render_columnar,
+    'ndjson': _render_ndjson,
+    'arrow': _render_arrow,
+}
+
+
+def render_cluster_response(result: ClusterResult, extra: Dict[str, Any], options: ResponseOptions):
+    """
+    Serializes a clustering result in the requested format. Only json builds
+    per-row dicts; the other formats stream columns or rows and reference
+    outliers by their row index.
+    """
+    return RENDERERS[options.format](result, extra, options)
@@ -0,0 +1,119 @@
+import os
+from sqlalchemy.orm import Session
+from datetime import date
+from typing import Dict, Any, Optional, Tuple
+from ..core.cache import ResultCache, SingleFlight
+from ..core.clustering import ClusterResult
+from ..core.instrumentation import stage, metrics
+from ..core.snapshots import ResultSnapshotStore
+from ..models.datasets import get_dataset, get_data_version
+from .responses import ResponseOptions, render_cluster_response
+
+
+results_cache = ResultCache(
+    maxsize=int(os.getenv("RESULT_CACHE_SIZE", "64")),
+    ttl=float(os.getenv("RESULT_CACHE_TTL", "300"))
+)
+
+# Concurrent identical requests share one computation
+in_flight = SingleFlight()
+
+# Inclusive (from, to) order-date bounds; None means all time
+Window = Optional[Tuple[Optional[date], Optional[date]]]
+
+# Shared across uvicorn workers when set; see ResultSnapshotStore
+snapshot_store = ResultSnapshotStore(os.environ["SNAPSHOT_DIR"]) if os.getenv("SNAPSHOT_DIR") else None
+
+
+def _load_or_fit(dataset: str, db: Session, version: str, eps: float = None, min_samples: int = None,
+                 window: Window = None, refresh: bool = True) -> Tuple[ClusterResult, str]:
+    spec = get_dataset(dataset)
+    if window is not None:
+        return spec.analyzer().fit(spec.load_window(db, *window, refresh=refresh), eps, min_samples), 'fit'
+    if snapshot_store is None:
+        return spec.analyzer().fit(spec.load(db), eps, min_samples), 'fit'
+    
+    result = snapshot_store.read(dataset, version, eps, min_samples)
+    if result is not None:
+        return result, 'snapshot'
+    with snapshot_store.writer_lock(dataset, eps, min_samples):
+        # Another worker may have written it while this one waited for the lock
+        result = snapshot_store.read(dataset, version, eps, min_samples)
+        if result is not None:
+            return result, 'snapshot'
+        result = spec.analyzer().fit(spec.load(db), eps, min_samples)
+        snapshot_store.write(dataset, result, version, eps, min_samples)
+    # Serve the mapped copy so this worker does not keep a private one
+    return snapshot_store.read(dataset, version, eps, min_samples) or result, 'fit'
+
+
+def get_cluster_results(dataset: str, db: Session, eps: float = None, min_samples: int = None,
+                        coalesce: bool = True, window: Window = None,
+                        version: str = None) -> Tuple[ClusterResult, Dict[str, Any]]:
+    """
+    Returns the fitted clustering result for a dataset, served from the result
+    cache while the data version and parameters are unchanged, together with
+    the cache status. With SNAPSHOT_DIR set, a miss first tries the shared
+    on-disk snapshot and only fits when no worker has written one yet.
+    
+    A window restricts the fit to orders dated within it. Its features are
+    merged from daily partials, and it is cached like any other parameter.
+    A caller fitting several windows refreshes the partials once and passes
+    the data version it read before that refresh; the windows then skip
+    the version check and fit from the partials as they are.
+    
+    Concurrent calls for the same dataset and parameters are coalesced: one
+    runs the version check and any fit, the others wait and share its result.
+    Cancellable background jobs pass coalesce=False, so a cancelled job never
+    fails the requests that would otherwise be waiting on it.
+    """
+    eps = float(eps) if eps is not None else None
+    min_samples = int(min_samples) if min_samples is not None else None
+    if not coalesce:
+        result, cache = _get_cluster_results(dataset, db, eps, min_samples, window, version)
+        return result, {**cache, 'coalesced': False}
+    (result, cache), coalesced = in_flight.do(
+        (dataset, eps, min_samples, window), _get_cluster_results, dataset, db, eps, min_samples, window, version
+    )
+    if coalesced:
+        metrics.inc('dbscan_coalesced_requests_total', dataset=result.name)
+    return result, {**cache, 'coalesced': coalesced}
+
+
+def _get_cluster_results(dataset: str, db: Session, eps: float = None, min_samples: int = None,
+                         window: Window = None, version: str = None) -> Tuple[ClusterResult, Dict[str, Any]]:
+    spec = get_dataset(dataset)
+    refresh = version is None
+    if refresh:
+        with stage('data_version', spec.name):
+            # Windows always read the database, whatever FEATURE_SOURCE is
+            version = spec.data_version(db) if window is None else get_data_version(db)
+    key = (dataset, version, eps, min_samples, window)
+    
+    cached = results_cache.get_with_age(key)
+    if cached is not None:
+        (result, age), source = cached, 'cache'
+    else:
+        results_cache.evict(lambda entry: entry[0] == dataset and entry[1] != version)
+        result, source = _load_or_fit(dataset, db, version, eps, min_samples, window, refresh)
+        results_cache.set(key, result)
+        age = 0.0
+    metrics.inc('dbscan_result_cache_total', dataset=spec.name,
+                result={'cache': 'hit', 'snapshot': 'snapshot', 'fit': 'miss'}[source])
+    
+    return result, {
+        'hit': source == 'cache',
+        'source': source,
+        'age_seconds': round(age, 3),
+        'data_version': version
+    }
+
+
+def get_cluster_response(dataset: str, db: Session, eps: float = None, min_samples: int = None,
+                         options: ResponseOptions = None, window: Window = None):
+    result, cache = get_cluster_results(dataset, db, eps, min_samples, window=window)
+    extra = {'cache': cache}
+    if window is not None:
+        extra['window'] = {'from': window[0] and window[0].isoformat(), 'to': window[1] and window[1].isoformat()}
+    with stage('serialize', result.name):
+        return render_cluster_response(result, extra, options or ResponseOptions())
@@ -0,0 +1,52 @@
+import numpy as np
+from sqlalchemy.orm import Session
+from typing import Callable, Dict, Any, List, Tuple
+from ..models.datasets import DatasetSpec
+
+
+MAX_SWEEP_POINTS = 1000
+
+
+def parse_grid(spec: str, cast: Callable = float) -> List:
+    """
+    Parses a grid given either as 'start:stop:step' (stop inclusive) or as a
+    comma-separated list of values.
+    """
+    if ':' in spec:
+        parts = spec.split(':')
+        if len(parts) != 3:
+            raise ValueError(f"Range '{spec}' must be start:stop:step")
+        start, stop, step = (float(part) for part in parts)
+        if step <= 0 or stop < start:
+            raise ValueError(f"Range '{spec}' must have step > 0 and stop >= start")
+        values = np.round(np.arange(start, stop + step / 2, step), 10)
+    else:
+        values = [value for value in spec.split(',') if value.strip()]
+    values = [cast(value) for value in values]
+    if not values:
+        raise ValueError(f"Grid '{spec}' is empty")
+    return values
+
+
+def parse_sweep_grid(eps: str, min_samples: str) -> Tuple[List[float], List[int]]:
+    """Parses and validates the eps and min_samples grids of a sweep."""
+    eps_values = parse_grid(eps, float)
+    min_samples_values = parse_grid(min_samples, int)
+    
+    if any(value <= 0 for value in eps_values) or any(value < 1 for value in min_samples_values):
+        raise ValueError("eps must be > 0 and min_samples >= 1")
+    if len(eps_values) * len(min_samples_values) > MAX_SWEEP_POINTS:
+        raise ValueError(f"Sweep grid exceeds {MAX_SWEEP_POINTS} combinations")
+    return eps_values, min_samples_values
+
+
+def run_sweep(spec: DatasetSpec, db: Session, eps: str, min_samples: str) -> Dict[str, Any]:
+    eps_values, min_samples_values = parse_sweep_grid(eps, min_samples)
+    df = spec.load(db)
+    results = spec.analyzer().sweep(df, eps_values, min_samples_values)
+    
+    return {
+        'dataset': spec.name,
+        'n_samples': len(df),
+        'results': results
+    }
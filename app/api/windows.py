@@ -0,0 +1,159 @@
+from datetime import date, timedelta
+from fastapi import HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Dict, Any, List, Optional, Tuple
+import pandas as pd
+from ..core.instrumentation import stage
+from ..models.datasets import get_dataset, get_data_version
+from ..models.feature_store import daily_partials
+from .responses import ResponseOptions
+from .results import get_cluster_results, get_cluster_response
+
+
+MAX_ROLLING_WINDOWS = 100
+
+
+class TimeWindow:
+    """
+    Query parameters restricting a clustering to orders within a date range.
+
+    - from / to: inclusive order-date bounds; either may be left open
+    - window: rolling mode; cluster consecutive windows of this many days
+    - step: days between rolling window starts (default: window)
+    """
+
+    def __init__(self, start: Optional[date] = Query(None, alias='from'),
+                 end: Optional[date] = Query(None, alias='to'),
+                 window: Optional[int] = None, step: Optional[int] = None):
+        if start is not None and end is not None and end < start:
+            raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+        if (window is not None and window < 1) or (step is not None and step < 1):
+            raise HTTPException(status_code=400, detail="window and step must be at least one day")
+        if step is not None and window is None:
+            raise HTTPException(status_code=400, detail="step requires window")
+        self.start = start
+        self.end = end
+        self.window = window
+        self.step = step or window
+
+    @property
+    def active(self) -> bool:
+        return self.start is not None or self.end is not None or self.window is not None
+
+    @property
+    def rolling(self) -> bool:
+        return self.window is not None
+
+    def bounds(self) -> Tuple[Optional[date], Optional[date]]:
+        return self.start, self.end
+
+    def rolling_bounds(self, first: date, last: date) -> List[Tuple[date, date]]:
+        """Consecutive windows within [from, to], defaulting to the days that have orders."""
+        start, end = self.start or first, self.end or last
+        length, step = timedelta(days=self.window - 1), timedelta(days=self.step)
+        windows = [(start, min(start + length, end))]
+        while windows[-1][0] + step + length <= end:
+            window_start = windows[-1][0] + step
+            windows.append((window_start, window_start + length))
+            if len(windows) > MAX_ROLLING_WINDOWS:
+                raise ValueError(f"Rolling range spans more than {MAX_ROLLING_WINDOWS} windows; widen step or window")
+        return windows
+
+
+def align_labels(previous: pd.Series, current: pd.Series, next_label: int) -> Tuple[pd.Series, int]:
+    """
+    Renames the clusters of current after the previous-window cluster they
+    share the most entities with, so stable segments keep their label.
+    Matching is greedy by overlap and one-to-one; unmatched clusters get
+    fresh labels from next_label. Noise stays -1.
+    """
+    shared = pd.concat({'previous': previous, 'current': current}, axis=1, join='inner')
+    shared = shared[(shared['previous'] != -1) & (shared['current'] != -1)]
+    overlap = shared.groupby(['current', 'previous']).size().sort_values(ascending=False, kind='stable')
+
+    mapping = {-1: -1}
+    taken = set()
+    for (cluster, match), _ in overlap.items():
+        if cluster not in mapping and match not in taken:
+            mapping[cluster] = match
+            taken.add(match)
+    for cluster in sorted(set(current.unique()) - set(mapping)):
+        mapping[cluster] = next_label
+        next_label += 1
+    return current.map(mapping), next_label
+
+
+def get_rolling_clusters(dataset: str, db: Session, time_window: TimeWindow,
+                         eps: float = None, min_samples: int = None) -> Dict[str, Any]:
+    """
+    Clusters consecutive date windows and reports, between each pair, the
+    entities whose (aligned) cluster label changed. Each window is fitted
+    and cached on its own, so overlapping requests reuse earlier fits.
+    The daily partials are refreshed once, and every window reads them at
+    the data version taken before that refresh.
+    """
+    with stage('data_version', get_dataset(dataset).name):
+        version = get_data_version(db)
+    daily_partials.refresh(db)
+    first, last = daily_partials.date_range()
+    if first is None:
+        raise ValueError("No dated orders to window")
+    bounds = time_window.rolling_bounds(first.date(), last.date())
+
+    windows, changes = [], []
+    previous, next_label = None, 0
+    for start, end in bounds:
+        result, cache = get_cluster_results(dataset, db, eps, min_samples, window=(start, end), version=version)
+        key = result.frame.columns[0]  # every feature frame leads with its entity id
+        labels = pd.Series(result.labels, index=result.frame[key].to_numpy())
+
+        with stage('align', result.name):
+            if previous is None:
+                aligned = labels
+                next_label = int(labels.max()) + 1 if len(labels) else 0
+            else:
+                aligned, next_label = align_labels(previous, labels, next_label)
+                both = previous.index.intersection(aligned.index)
+                before, after = previous.loc[both], aligned.loc[both]
+                moved = before.index[before.to_numpy() != after.to_numpy()]
+                changes.append({
+                    'from_window': len(windows) - 1,
+                    'to_window': len(windows),
+                    'n_changed': len(moved),
+                    'changes': [
+                        {key: entity, 'from': int(before[entity]), 'to': int(after[entity])}
+                        for entity in moved.tolist()
+                    ],
+                })
+
+        sizes = aligned.value_counts().sort_index()
+        windows.append({
+            'from': start.isoformat(),
+            'to': end.isoformat(),
+            'n_samples': len(labels),
+            'n_clusters': int((sizes.index != -1).sum()),
+            'n_outliers': int(sizes.get(-1, 0)),
+            'sizes': {int(label): int(size) for label, size in sizes.items()},
+            'params': result.params,
+            'cache': cache,
+        })
+        previous = aligned
+
+    return {
+        'dataset': dataset,
+        'window_days': time_window.window,
+        'step_days': time_window.step,
+        'windows': windows,
+        'changes': changes,
+    }
+
+
+def get_windowed_cluster_response(dataset: str, db: Session, eps: float = None, min_samples: int = None,
+                                  options: ResponseOptions = None, time_window: TimeWindow = None):
+    """Cluster response over all time, over one date window, or across rolling windows."""
+    if time_window is not None and time_window.rolling:
+        if options is not None and (options.format != 'json' or not options.include_members or options.paginated):
+            raise ValueError("Rolling windows return JSON summaries only; format, include_members, limit and offset are not supported")
+        return get_rolling_clusters(dataset, db, time_window, eps, min_samples)
+    window = time_window.bounds() if time_window is not None and time_window.active else None
+    return get_cluster_response(dataset, db, eps, min_samples, options, window)
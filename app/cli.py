@@ -0,0 +1,89 @@
+"""
+Command-line maintenance tasks.
+
+    python -m app.cli export-features --dir feature_snapshots
+    python -m app.cli snapshot-results --dir snapshots customers products
+    python -m app.cli report --dir reports --workers 4
+"""
+import argparse
+import os
+import sys
+
+from .database import SessionLocal
+from .models.datasets import DATASETS, get_dataset, export_feature_snapshots
+
+
+def snapshot_results(args: argparse.Namespace) -> None:
+    """Fits each dataset and publishes it as the current shared result snapshot."""
+    from .core.snapshots import ResultSnapshotStore
+
+    store = ResultSnapshotStore(args.dir)
+    db = SessionLocal()
+    try:
+        for dataset in args.datasets or list(DATASETS):
+            spec = get_dataset(dataset)
+            version = spec.data_version(db)
+            with store.writer_lock(dataset, args.eps, args.min_samples):
+                result = spec.analyzer().fit(spec.load(db), args.eps, args.min_samples)
+                snapshot = store.write(dataset, result, version, args.eps, args.min_samples)
+            print(f"{dataset}: {len(result.frame)} rows -> {store.slot(dataset, args.eps, args.min_samples)}/{snapshot}")
+    finally:
+        db.close()
+
+
+def export_features(args: argparse.Namespace) -> None:
+    """Exports feature frames to Parquet so analyses can run without the database."""
+    db = SessionLocal()
+    try:
+        for dataset, path in export_feature_snapshots(db, args.dir, args.datasets).items():
+            print(f"{dataset}: {path}")
+    finally:
+        db.close()
+
+
+def report(args: argparse.Namespace) -> None:
+    """Renders the cluster and k-distance figures of each dataset in parallel."""
+    from .report import generate_report
+
+    db = SessionLocal()
+    try:
+        result = generate_report(db, args.dir, args.datasets, args.workers)
+    finally:
+        db.close()
+    for dataset, summary in result['datasets'].items():
+        print(f"{dataset}: {summary['rows']} rows, {summary['clusters']} clusters ({summary['rendering']}) -> "
+              f"{', '.join(summary['figures'].values())}")
+    print(f"{args.dir}/report.json written in {result['seconds']}s")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    export = commands.add_parser('export-features', help='Export feature frames to Parquet snapshots')
+    export.add_argument('datasets', nargs='*', help='Datasets to export (default: all)')
+    export.add_argument('--dir', default=os.getenv("FEATURE_SNAPSHOT_DIR", "feature_snapshots"))
+    export.set_defaults(handler=export_features)
+
+    snapshot = commands.add_parser('snapshot-results', help='Fit datasets and write memory-mapped result snapshots')
+    snapshot.add_argument('datasets', nargs='*', help='Datasets to fit (default: all)')
+    snapshot.add_argument('--dir', default=os.getenv("SNAPSHOT_DIR", "snapshots"))
+    snapshot.add_argument('--eps', type=float, default=None)
+    snapshot.add_argument('--min-samples', type=int, default=None)
+    snapshot.set_defaults(handler=snapshot_results)
+
+    plots = commands.add_parser('report', help='Render cluster plots and k-distance graphs for datasets')
+    plots.add_argument('datasets', nargs='*', help='Datasets to plot (default: all)')
+    plots.add_argument('--dir', default='reports')
+    plots.add_argument('--workers', type=int, default=None, help='Rendering processes (default: CPU count)')
+    plots.set_defaults(handler=report)
+
+    args = parser.parse_args(argv)
+    try:
+        args.handler(args)
+    except KeyError as e:
+        sys.exit(str(e))
+
+
+if __name__ == '__main__':
+    main()
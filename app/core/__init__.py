@@ -1,6 +1,18 @@
-from .clustering import ClusterAnalyzer
-from .optimization import ParameterOptimizer
-from .preprocessing import DataPreprocessor
-from .visualization import ClusterVisualizer
+import importlib
+
+# Submodules are imported on first attribute access so that importing
+# app.core stays cheap; sklearn and friends load when they are used.
+_EXPORTS = {
+    'ClusterAnalyzer': '.clustering',
+    'ParameterOptimizer': '.optimization',
+    'DataPreprocessor': '.preprocessing',
+    'ClusterVisualizer': '.visualization',
+}
 
 __all__ = ['ClusterAnalyzer', 'ParameterOptimizer', 'DataPreprocessor', 'ClusterVisualizer']
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
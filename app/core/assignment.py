@@ -0,0 +1,148 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import numpy as np
+from typing import Dict, Any, List, Optional, Tuple
+from .clustering import ClusterResult
+
+
+class ClusterModel:
+    """
+    A fitted DBSCAN model reduced to what is needed to label new points: the
+    scaler parameters, the core samples with their cluster labels and eps.
+    A new point joins the cluster of its nearest core sample when that
+    sample is within eps, which is the DBSCAN border-point rule; otherwise
+    it is noise (-1). Lookups go through a KD-tree over the core samples.
+    """
+
+    def __init__(self, name: str, feature_columns: List[str], scaler_mean: np.ndarray,
+                 scaler_scale: np.ndarray, core_points: np.ndarray, core_labels: np.ndarray,
+                 eps: float, min_samples: int, data_version: Optional[str] = None,
+                 fitted_at: Optional[float] = None):
+        self.name = name
+        self.feature_columns = list(feature_columns)
+        self.scaler_mean = np.asarray(scaler_mean, dtype=np.float64)
+        self.scaler_scale = np.asarray(scaler_scale, dtype=np.float64)
+        self.core_points = np.asarray(core_points, dtype=np.float64)
+        self.core_labels = np.asarray(core_labels)
+        self.eps = float(eps)
+        self.min_samples = int(min_samples)
+        self.data_version = data_version
+        self.fitted_at = fitted_at if fitted_at is not None else time.time()
+        self._tree = None
+
+    @classmethod
+    def from_result(cls, result: ClusterResult, data_version: Optional[str] = None) -> 'ClusterModel':
+        core = result.core_sample_indices
+        return cls(
+            name=result.name,
+            feature_columns=result.feature_columns,
+            scaler_mean=result.scaler_mean,
+            scaler_scale=result.scaler_scale,
+            core_points=result.scaled_features[core],
+            core_labels=result.labels[core],
+            eps=result.params['eps'],
+            min_samples=result.params['min_samples'],
+            data_version=data_version
+        )
+
+    @property
+    def tree(self):
+        if self._tree is None and len(self.core_points):
+            from sklearn.neighbors import KDTree
+            self._tree = KDTree(self.core_points)
+        return self._tree
+
+    def transform(self, features: np.ndarray) -> np.ndarray:
+        return (np.asarray(features, dtype=np.float64) - self.scaler_mean) / self.scaler_scale
+
+    def predict(self, features: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the cluster label and the distance to the nearest core sample for each row."""
+        scaled = self.transform(np.atleast_2d(features))
+        if self.tree is None:
+            return np.full(len(scaled), -1), np.full(len(scaled), np.inf)
+        distances, indices = self.tree.query(scaled, k=1)
+        distances, indices = distances[:, 0], indices[:, 0]
+        labels = np.where(distances <= self.eps, self.core_labels[indices], -1)
+        return labels, distances
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'feature_columns': self.feature_columns,
+            'eps': self.eps,
+            'min_samples': self.min_samples,
+            'n_core_samples': int(len(self.core_points)),
+            'n_clusters': int(len(np.unique(self.core_labels))),
+            'data_version': self.data_version,
+            'fitted_at': self.fitted_at
+        }
+
+    def save(self, path: str) -> None:
+        meta = {key: value for key, value in self.summary().items() if key not in ('n_core_samples', 'n_clusters')}
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # Write to a temporary file and rename, so readers never see a partial model
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.npz')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(
+                    f,
+                    scaler_mean=self.scaler_mean,
+                    scaler_scale=self.scaler_scale,
+                    core_points=self.core_points,
+                    core_labels=self.core_labels,
+                    meta=np.array(json.dumps(meta))
+                )
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> 'ClusterModel':
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            return cls(
+                scaler_mean=data['scaler_mean'],
+                scaler_scale=data['scaler_scale'],
+                core_points=data['core_points'],
+                core_labels=data['core_labels'],
+                **meta
+            )
+
+
+class ModelStore:
+    """
+    Fitted models by dataset, persisted under a directory and cached in
+    memory. A model refitted by another worker is picked up on the next
+    lookup, because the file's modification time changes.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._models: Dict[str, Tuple[ClusterModel, float]] = {}
+        self._lock = threading.Lock()
+
+    def path(self, dataset: str) -> str:
+        return os.path.join(self.directory, f'{dataset}.npz')
+
+    def get(self, dataset: str) -> Optional[ClusterModel]:
+        path = self.path(dataset)
+        try:
+            mtime = os.stat(path).st_mtime
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            cached = self._models.get(dataset)
+            if cached is None or cached[1] != mtime:
+                cached = (ClusterModel.load(path), mtime)
+                self._models[dataset] = cached
+            return cached[0]
+
+    def put(self, dataset: str, model: ClusterModel) -> None:
+        model.save(self.path(dataset))
+        with self._lock:
+            self._models[dataset] = (model, os.stat(self.path(dataset)).st_mtime)
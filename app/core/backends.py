@@ -0,0 +1,144 @@
+import os
+import numpy as np
+from typing import Optional, Tuple, Union
+from .instrumentation import checkpoint
+
+
+class ExactDBSCAN:
+    """sklearn's DBSCAN over the whole matrix."""
+
+    name = 'exact'
+
+    def fit(self, scaled_features: np.ndarray, eps: float, min_samples: int,
+            sample_weight: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        from sklearn.cluster import DBSCAN
+        dbscan = DBSCAN(eps=eps, min_samples=min_samples)
+        labels = dbscan.fit_predict(scaled_features, sample_weight=sample_weight)
+        return labels, dbscan.core_sample_indices_
+
+
+class PartitionedDBSCAN:
+    """
+    DBSCAN that never materializes every neighborhood at once.
+
+    Rows are processed in chunks sized to stay under a memory ceiling, and
+    each chunk's radius queries run on n_jobs cores. The passes are:
+
+    1. Count weighted neighbors per chunk to find the core points.
+    2. Merge core points joined by an edge, across chunk borders, with a
+       vectorized union-find.
+    3. Attach each border point to the lowest-numbered adjacent cluster.
+
+    Clusters are numbered by their smallest core index, and border points
+    take the lowest adjacent label. sklearn's sequential expansion follows
+    the same rules, so the labels match the exact engine. The cost is
+    running the radius queries more than once.
+    """
+
+    name = 'partitioned'
+
+    # Per-neighbor bytes (index plus edge arrays) and per-row overhead of a radius query
+    BYTES_PER_NEIGHBOR = 32
+    BYTES_PER_ROW = 128
+    ESTIMATE_SAMPLE = 512
+
+    def __init__(self, max_memory_mb: float = None, n_jobs: int = None, chunk_size: int = None):
+        self.max_memory_mb = max_memory_mb if max_memory_mb is not None else float(os.getenv("PARTITION_MEMORY_MB", "256"))
+        self.n_jobs = n_jobs if n_jobs is not None else int(os.getenv("PARTITION_JOBS", "-1"))
+        self.chunk_size = chunk_size
+
+    def _chunk_size(self, nbrs, scaled_features: np.ndarray) -> int:
+        if self.chunk_size:
+            return self.chunk_size
+        n_samples = len(scaled_features)
+        rng = np.random.default_rng(0)
+        sample = rng.choice(n_samples, size=min(n_samples, self.ESTIMATE_SAMPLE), replace=False)
+        neighborhoods = nbrs.radius_neighbors(scaled_features[sample], return_distance=False)
+        # Dense regions dominate memory, so size chunks for the upper tail
+        expected = np.percentile([len(neighbors) for neighbors in neighborhoods], 90)
+        row_bytes = expected * self.BYTES_PER_NEIGHBOR + self.BYTES_PER_ROW
+        return max(1, int(self.max_memory_mb * 2 ** 20 / row_bytes))
+
+    def _neighbor_edges(self, nbrs, scaled_features: np.ndarray, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        if not len(rows):
+            return rows, np.empty(0, dtype=np.intp)
+        neighborhoods = nbrs.radius_neighbors(scaled_features[rows], return_distance=False)
+        lengths = np.fromiter((len(neighbors) for neighbors in neighborhoods), dtype=np.int64, count=len(rows))
+        return np.repeat(rows, lengths), np.concatenate(neighborhoods)
+
+    @staticmethod
+    def _union(root: np.ndarray, sources: np.ndarray, targets: np.ndarray) -> np.ndarray:
+        from scipy.sparse import coo_matrix
+        from scipy.sparse.csgraph import connected_components
+
+        source_roots, target_roots = root[sources], root[targets]
+        differ = source_roots != target_roots
+        if not differ.any():
+            return root
+        nodes, inverse = np.unique(np.concatenate([source_roots[differ], target_roots[differ]]), return_inverse=True)
+        half = differ.sum()
+        graph = coo_matrix((np.ones(half, dtype=np.int8), (inverse[:half], inverse[half:])), shape=(len(nodes), len(nodes)))
+        _, components = connected_components(graph, directed=False)
+        component_min = np.full(components.max() + 1, np.iinfo(np.int64).max)
+        np.minimum.at(component_min, components, nodes)
+        remap = np.arange(len(root))
+        remap[nodes] = component_min[components]
+        return remap[root]
+
+    def fit(self, scaled_features: np.ndarray, eps: float, min_samples: int,
+            sample_weight: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        from sklearn.neighbors import NearestNeighbors
+
+        n_samples = len(scaled_features)
+        weights = np.ones(n_samples) if sample_weight is None else np.asarray(sample_weight, dtype=np.float64)
+        nbrs = NearestNeighbors(radius=eps, n_jobs=self.n_jobs).fit(scaled_features)
+        chunk_size = self._chunk_size(nbrs, scaled_features)
+        chunks = [np.arange(start, min(start + chunk_size, n_samples)) for start in range(0, n_samples, chunk_size)]
+
+        is_core = np.zeros(n_samples, dtype=bool)
+        for rows in chunks:
+            checkpoint('dbscan')
+            sources, targets = self._neighbor_edges(nbrs, scaled_features, rows)
+            neighborhood_weight = np.bincount(sources - rows[0], weights=weights[targets], minlength=len(rows))
+            is_core[rows] = neighborhood_weight >= min_samples
+
+        root = np.arange(n_samples)
+        for rows in chunks:
+            checkpoint('dbscan')
+            core_rows = rows[is_core[rows]]
+            sources, targets = self._neighbor_edges(nbrs, scaled_features, core_rows)
+            keep = is_core[targets]
+            root = self._union(root, sources[keep], targets[keep])
+
+        labels = np.full(n_samples, -1, dtype=np.int64)
+        core_indices = np.flatnonzero(is_core)
+        _, labels[core_indices] = np.unique(root[core_indices], return_inverse=True)
+
+        border_label = np.full(n_samples, np.iinfo(np.int64).max)
+        for rows in chunks:
+            checkpoint('dbscan')
+            other_rows = rows[~is_core[rows]]
+            sources, targets = self._neighbor_edges(nbrs, scaled_features, other_rows)
+            keep = is_core[targets]
+            np.minimum.at(border_label, sources[keep], labels[targets[keep]])
+        border = (~is_core) & (border_label != np.iinfo(np.int64).max)
+        labels[border] = border_label[border]
+
+        return labels, core_indices
+
+
+BACKENDS = {
+    ExactDBSCAN.name: ExactDBSCAN,
+    PartitionedDBSCAN.name: PartitionedDBSCAN,
+}
+
+
+def get_backend(backend: Union[str, object, None] = None):
+    """Resolves a backend instance from a name, an instance or CLUSTER_BACKEND (default 'exact')."""
+    if backend is None:
+        backend = os.getenv("CLUSTER_BACKEND", ExactDBSCAN.name)
+    if isinstance(backend, str):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown clustering backend '{backend}'. Expected one of: {', '.join(BACKENDS)}")
+        return BACKENDS[backend]()
+    return backend
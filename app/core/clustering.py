@@ -1,52 +1,179 @@
+import os
 import pandas as pd
 import numpy as np
-from sklearn.cluster import DBSCAN
-from typing import Dict, Any, List
-from .preprocessing import DataPreprocessor
+from typing import Dict, Any, List, Sequence, Tuple
+from .preprocessing import DataPreprocessor, FeatureScaler
 from .optimization import ParameterOptimizer
-from .visualization import ClusterVisualizer
+from .instrumentation import stage, record_fit
+from .backends import get_backend
+
+
+# Per-column statistics reported for every cluster, in one groupby
+CLUSTER_STATS = ['mean', 'std', 'median', 'min', 'max']
+
+# Collapse identical scaled rows into weighted points before clustering
+DEDUPLICATE_FEATURES = os.getenv("DEDUPLICATE_FEATURES", "true").lower() in ("1", "true", "yes")
+
+
+def deduplicate_rows(features: np.ndarray):
+    """
+    Collapses identical rows. Returns the unique rows in order of first
+    occurrence, their multiplicities, and for every input row the index of
+    its unique row. Keeping first-occurrence order means DBSCAN visits the
+    points in the same order as on the full data, so cluster numbering and
+    border-point ties come out the same.
+    """
+    unique, first, inverse, counts = np.unique(
+        features, axis=0, return_index=True, return_inverse=True, return_counts=True
+    )
+    order = np.argsort(first)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return unique[order], counts[order], rank[inverse.reshape(-1)]
+
+
+class ClusterResult:
+    def __init__(self, name: str, frame: pd.DataFrame, labels: np.ndarray,
+                 cluster_stats: Dict[str, Any], params: Dict[str, Any],
+                 feature_columns: List[str] = None, scaled_features: np.ndarray = None,
+                 scaler_mean: np.ndarray = None, scaler_scale: np.ndarray = None,
+                 core_sample_indices: np.ndarray = None, cluster_summary: Dict[str, Any] = None):
+        self.name = name
+        self.frame = frame
+        self.labels = labels
+        self.cluster_stats = cluster_stats
+        self.cluster_summary = cluster_summary
+        self.params = params
+        self.feature_columns = feature_columns
+        self.scaled_features = scaled_features
+        self.scaler_mean = scaler_mean
+        self.scaler_scale = scaler_scale
+        self.core_sample_indices = core_sample_indices
+    
+    @property
+    def members_key(self) -> str:
+        return f'{self.name}s'
+    
+    def outlier_indices(self) -> np.ndarray:
+        return np.flatnonzero(self.labels == -1)
+    
+    def records(self) -> List[Dict[str, Any]]:
+        # Built per response, never kept: results are shared by the result cache and snapshot store
+        return self.frame.to_dict(orient='records')
+    
+    def to_dict(self) -> Dict[str, Any]:
+        records = self.records()
+        return {
+            self.members_key: records,
+            'outliers': [records[i] for i in self.outlier_indices()],
+            'cluster_stats': self.cluster_stats,
+            **({'cluster_summary': self.cluster_summary} if self.cluster_summary is not None else {}),
+            'params': self.params
+        }
 
 
 class ClusterAnalyzer:
-    def __init__(self, feature_columns: List[str], name: str):
+    def __init__(self, feature_columns: List[str], name: str, backend=None, compact: bool = None):
         self.feature_columns = feature_columns
         self.name = name
         self.optimizer = ParameterOptimizer()
-        self.visualizer = ClusterVisualizer()
+        self.backend = get_backend(backend)
+        self.compact = compact
     
-    def analyze(self, df: pd.DataFrame, eps: float = None, min_samples: int = None) -> Dict[str, Any]:
-        features = df[self.feature_columns]
-        
-        if features.isnull().any().any():
-            features = features.fillna(0)
+    def _scale(self, df: pd.DataFrame):
+        scaler = FeatureScaler(self.compact)
+        return scaler.fit_transform(df, self.feature_columns), scaler
+    
+    def summarize(self, df: pd.DataFrame, labels: np.ndarray, scaler) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Per-cluster statistics from a single groupby over all feature columns,
+        keyed by the label array so df is not modified. Returns cluster_stats
+        ({column: {stat: {label: value}}}) and a summary with the size and
+        centroid of each cluster. The scaled centroid follows from the raw
+        one, since scaling is affine.
+        """
+        grouped = df[self.feature_columns].groupby(labels)
+        stats = grouped.agg(CLUSTER_STATS)
+        cluster_stats = {
+            col: {stat: stats[(col, stat)].to_dict() for stat in CLUSTER_STATS}
+            for col in self.feature_columns
+        }
         
-        from sklearn.preprocessing import StandardScaler
-        scaler = StandardScaler()
-        scaled_features = scaler.fit_transform(features)
+        centroids = stats.xs('mean', axis=1, level=1)[self.feature_columns]
+        scaled_centroids = (centroids - scaler.mean_) / scaler.scale_
+        cluster_summary = {
+            'sizes': grouped.size().to_dict(),
+            'centroids': dict(zip(centroids.index.tolist(), centroids.to_numpy().tolist())),
+            'scaled_centroids': dict(zip(scaled_centroids.index.tolist(), scaled_centroids.to_numpy().tolist())),
+        }
+        return cluster_stats, cluster_summary
+    
+    def prepare(self, df: pd.DataFrame) -> np.ndarray:
+        return self._scale(df)[0]
+    
+    def sweep(self, df: pd.DataFrame, eps_values: Sequence[float],
+              min_samples_values: Sequence[int]) -> List[Dict[str, Any]]:
+        with stage('scale', self.name):
+            scaled_features = self.prepare(df)
+        with stage('sweep', self.name):
+            return self.optimizer.sweep(scaled_features, eps_values, min_samples_values)
+    
+    def fit(self, df: pd.DataFrame, eps: float = None, min_samples: int = None) -> ClusterResult:
+        with stage('scale', self.name):
+            scaled_features, scaler = self._scale(df)
         
-        if eps is None:
-            eps = self.optimizer.find_optimal_eps(scaled_features, min_samples or 2)
+        # Fit on the distinct rows, each weighted by its multiplicity, and broadcast back
+        points, weights, inverse = scaled_features, None, None
+        if DEDUPLICATE_FEATURES and len(scaled_features):
+            with stage('dedupe', self.name):
+                unique, counts, rows = deduplicate_rows(scaled_features)
+                if len(unique) < len(scaled_features):
+                    points, weights, inverse = unique, counts, rows
         
+        eps_k = min_samples or 2
         if min_samples is None:
             min_samples = self.optimizer.find_optimal_min_samples(len(df))
         
-        self.visualizer.plot_k_distance(scaled_features, self.name, min_samples)
+        eps_estimate = None
+        if eps is None:
+            with stage('eps_search', self.name):
+                if self.optimizer.should_sample_eps(len(points)):
+                    eps_estimate = self.optimizer.estimate_eps(points, eps_k, sample_weight=weights)
+                    eps = eps_estimate.pop('eps')
+                else:
+                    eps = self.optimizer.find_optimal_eps(points, eps_k, sample_weight=weights)
         
-        dbscan = DBSCAN(eps=eps, min_samples=min_samples)
-        clusters = dbscan.fit_predict(scaled_features)
+        with stage('dbscan', self.name):
+            clusters, core_sample_indices = self.backend.fit(points, eps, min_samples, sample_weight=weights)
+            if inverse is not None:
+                is_core = np.zeros(len(points), dtype=bool)
+                is_core[core_sample_indices] = True
+                clusters = clusters[inverse]
+                core_sample_indices = np.flatnonzero(is_core[inverse])
         
-        df['cluster'] = clusters
+        with stage('stats', self.name):
+            cluster_stats, cluster_summary = self.summarize(df, clusters, scaler)
+            frame = df.assign(cluster=clusters)
         
-        cluster_stats = {}
-        for col in self.feature_columns:
-            cluster_stats[col] = df.groupby('cluster')[col].agg(['mean', 'std']).to_dict()
+        record_fit(self.name, len(df), len(points))
         
-        return {
-            f'{self.name}s': df.to_dict(orient='records'),
-            'outliers': df[df['cluster'] == -1].to_dict(orient='records'),
-            'cluster_stats': cluster_stats,
-            'params': {
+        return ClusterResult(
+            name=self.name,
+            frame=frame,
+            labels=clusters,
+            cluster_stats=cluster_stats,
+            cluster_summary=cluster_summary,
+            params={
                 'eps': eps,
-                'min_samples': min_samples
-            }
-        }
+                'min_samples': min_samples,
+                **({'eps_estimate': eps_estimate} if eps_estimate else {})
+            },
+            feature_columns=self.feature_columns,
+            scaled_features=scaled_features,
+            scaler_mean=scaler.mean_,
+            scaler_scale=scaler.scale_,
+            core_sample_indices=core_sample_indices
+        )
+    
+    def analyze(self, df: pd.DataFrame, eps: float = None, min_samples: int = None) -> Dict[str, Any]:
+        return self.fit(df, eps, min_samples).to_dict()
@@ -0,0 +1,201 @@
+import bisect
+import resource
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+METRIC_HELP = {
+    'dbscan_stage_duration_seconds': ('histogram', 'Time spent per pipeline stage'),
+    'dbscan_rows': ('gauge', 'Rows in the most recently clustered frame'),
+    'dbscan_unique_rows': ('gauge', 'Distinct feature vectors the most recent fit clustered, after collapsing duplicates'),
+    'dbscan_peak_rss_bytes': ('gauge', 'Process peak resident set size observed after a fit'),
+    'dbscan_jobs_total': ('counter', 'Background jobs by final status, plus submissions rejected on a full queue'),
+    'dbscan_coalesced_requests_total': ('counter', 'Requests that shared an identical in-flight computation'),
+    'dbscan_result_cache_total': ('counter', 'Result lookups by outcome: hit (memory), snapshot (shared disk) or miss (fitted)'),
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class StageTimings:
+    """Stage durations collected for a single request."""
+
+    def __init__(self):
+        self.stages: List[Tuple[str, float]] = []
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.stages.append((name, seconds))
+
+    def server_timing(self) -> str:
+        with self._lock:
+            return ', '.join(f'{name};dur={seconds * 1000:.1f}' for name, seconds in self.stages)
+
+
+class MetricsRegistry:
+    """Minimal thread-safe Prometheus registry: histograms, gauges and counters."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._histograms: Dict[str, Dict[LabelKey, List[float]]] = {}
+        self._values: Dict[str, Dict[LabelKey, float]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(labels: Dict[str, Optional[str]]) -> LabelKey:
+        return tuple(sorted((name, str(value)) for name, value in labels.items() if value is not None))
+
+    def observe(self, name: str, value: float, **labels: Optional[str]) -> None:
+        key = self._key(labels)
+        with self._lock:
+            # Per-bucket counts followed by sum and count
+            series = self._histograms.setdefault(name, {}).setdefault(key, [0.0] * (len(self.buckets) + 2))
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def set_gauge(self, name: str, value: float, **labels: Optional[str]) -> None:
+        with self._lock:
+            self._values.setdefault(name, {})[self._key(labels)] = value
+
+    def inc(self, name: str, amount: float = 1, **labels: Optional[str]) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    @staticmethod
+    def _format_value(value: float) -> str:
+        return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+    @staticmethod
+    def _format_labels(key: LabelKey, extra: str = '') -> str:
+        parts = [f'{name}="{value}"' for name, value in key]
+        if extra:
+            parts.append(extra)
+        return '{' + ','.join(parts) + '}' if parts else ''
+
+    def _header(self, name: str, default_type: str) -> List[str]:
+        metric_type, help_text = METRIC_HELP.get(name, (default_type, name))
+        return [f'# HELP {name} {help_text}', f'# TYPE {name} {metric_type}']
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._histograms.items()):
+                lines.extend(self._header(name, 'histogram'))
+                for key, values in sorted(series.items()):
+                    cumulative = 0.0
+                    for bound, count in zip(self.buckets + (float('inf'),), values):
+                        cumulative += count
+                        le = '+Inf' if bound == float('inf') else repr(bound)
+                        bucket_labels = self._format_labels(key, 'le="%s"' % le)
+                        lines.append(f'{name}_bucket{bucket_labels} {self._format_value(cumulative)}')
+                    lines.append(f'{name}_sum{self._format_labels(key)} {self._format_value(values[-2])}')
+                    lines.append(f'{name}_count{self._format_labels(key)} {self._format_value(values[-1])}')
+            for name, series in sorted(self._values.items()):
+                lines.extend(self._header(name, 'gauge'))
+                for key, value in sorted(series.items()):
+                    lines.append(f'{name}{self._format_labels(key)} {self._format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+
+_request_timings: ContextVar[Optional[StageTimings]] = ContextVar('request_timings', default=None)
+
+# Called with (stage, 'start' | 'end' | 'check'); background jobs use it for progress and cancellation
+StageListener = Callable[[str, str], None]
+_stage_listener: ContextVar[Optional[StageListener]] = ContextVar('stage_listener', default=None)
+
+
+def start_request_timings() -> StageTimings:
+    timings = StageTimings()
+    _request_timings.set(timings)
+    return timings
+
+
+def set_stage_listener(listener: Optional[StageListener]):
+    """Installs a listener for stages run in the current context; returns a token for reset_stage_listener."""
+    return _stage_listener.set(listener)
+
+
+def reset_stage_listener(token) -> None:
+    _stage_listener.reset(token)
+
+
+@contextmanager
+def stage(name: str, dataset: Optional[str] = None) -> Iterator[None]:
+    """
+    Times a pipeline stage. Records it on the current request (for the
+    Server-Timing header) and in the stage-duration histogram, and notifies
+    the stage listener, if any, when the stage starts and when it completes.
+    An exception raised by the listener aborts the pipeline at that boundary.
+    """
+    listener = _stage_listener.get()
+    if listener is not None:
+        listener(name, 'start')
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.add(name, elapsed)
+        metrics.observe('dbscan_stage_duration_seconds', elapsed, dataset=dataset, stage=name)
+    if listener is not None:
+        listener(name, 'end')
+
+
+def checkpoint(name: str) -> None:
+    """
+    Notifies the stage listener, if any, from inside a long stage (once per
+    grid point, chunk or bootstrap round), so it can abort the stage there
+    rather than at its end.
+    """
+    listener = _stage_listener.get()
+    if listener is not None:
+        listener(name, 'check')
+
+
+def record_fit(dataset: str, n_rows: int, n_unique: Optional[int] = None) -> None:
+    metrics.set_gauge('dbscan_rows', n_rows, dataset=dataset)
+    if n_unique is not None:
+        metrics.set_gauge('dbscan_unique_rows', n_unique, dataset=dataset)
+    # ru_maxrss is reported in kilobytes on Linux
+    metrics.set_gauge('dbscan_peak_rss_bytes', resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024, dataset=dataset)
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware that collects the stage timings of each HTTP request and
+    returns them in a Server-Timing header, together with the total time.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        timings = start_request_timings()
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message['type'] == 'http.response.start':
+                timings.add('total', time.perf_counter() - start)
+                headers = list(message.get('headers', []))
+                headers.append((b'server-timing', timings.server_timing().encode()))
+                message = {**message, 'headers': headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_timing)
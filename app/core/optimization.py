@@ -1,29 +1,318 @@
+import os
 import numpy as np
-from sklearn.neighbors import NearestNeighbors
-from kneed import KneeLocator
 import pandas as pd
+from typing import Any, Dict, List, Optional, Sequence
+from .instrumentation import checkpoint
+
+
+DEFAULT_EPS = 0.5
+SILHOUETTE_SAMPLE_SIZE = 2000
+
+# Above EPS_SAMPLE_THRESHOLD rows, eps is estimated from a stratified sample
+EPS_SAMPLE_THRESHOLD = int(os.getenv("EPS_SAMPLE_THRESHOLD", "50000"))
+EPS_SAMPLE_SIZE = int(os.getenv("EPS_SAMPLE_SIZE", "10000"))
+EPS_STRATA = 10
+EPS_CURVE_QUANTILES = 500
+# The very top of the curve is a handful of outliers that a sample cannot pin down
+EPS_CURVE_TAIL = 0.999
+EPS_BOOTSTRAP_ROUNDS = 100
+# A sweep is rejected when its radius graph would hold more neighbor pairs than this (~12 bytes each)
+SWEEP_MAX_GRAPH_ENTRIES = int(os.getenv("SWEEP_MAX_GRAPH_ENTRIES", "25000000"))
+SWEEP_ESTIMATE_SAMPLE = 1000
+# Bound on the neighbor distances materialized at once while estimating the graph size
+SWEEP_ESTIMATE_BATCH = 2_000_000
+EPS_CONFIDENCE = 0.95
+# Curve the exact eps search takes the knee of: 'full' (every point) or
+# 'trimmed' (the quantile-compressed, tail-trimmed curve of the sampled search)
+EPS_KNEE_CURVE = os.getenv("EPS_KNEE_CURVE", "full")
+
+
+def _kneedle(curve: np.ndarray, sensitivity: float = 1.0) -> Optional[int]:
+    """
+    Knee of an increasing convex curve by Kneedle (Satopaa et al., 2011),
+    as kneed's KneeLocator(range(1, n + 1), curve, curve='convex',
+    direction='increasing') finds it, without importing kneed (and with it
+    matplotlib): the first local maximum of the difference curve after
+    which the difference drops below that maximum minus sensitivity times
+    the x spacing. Returns the knee's x on that 1-based axis.
+    """
+    n = len(curve)
+    span = curve.max() - curve.min() if n else 0
+    if n < 3 or not span > 0:
+        return None
+    x = np.arange(n) / (n - 1)
+    normalized = (curve - curve.min()) / span
+    difference = np.flip(normalized.max() - normalized) - x
+    before, after = np.r_[difference[0], difference[:-1]], np.r_[difference[1:], difference[-1]]
+    maxima = (difference >= before) & (difference >= after)
+    minima = (difference <= before) & (difference <= after)
+    threshold, knee_index, active = None, None, False
+    for i in range(int(np.argmax(maxima)), n - 1):
+        if maxima[i]:
+            threshold, knee_index, active = difference[i] - sensitivity * np.diff(x).mean(), i, True
+        if minima[i]:
+            threshold, active = 0.0, False
+        if active and difference[i + 1] < threshold:
+            return n - knee_index
+    return None
+
+
+def _curve_knee(sorted_distances: np.ndarray, trimmed: bool = False,
+                quantiles: int = EPS_CURVE_QUANTILES) -> Optional[int]:
+    """
+    Index of the knee of a sorted k-distance curve. With trimmed, curves
+    longer than quantiles points are located on their quantile-compressed
+    form with the top tail trimmed; otherwise every point is used.
+    """
+    n = len(sorted_distances)
+    if not trimmed or n <= quantiles:
+        return _kneedle(np.asarray(sorted_distances, dtype=np.float64))
+    positions = np.linspace(0, EPS_CURVE_TAIL, quantiles)
+    knee = _kneedle(np.quantile(sorted_distances, positions))
+    return int(round(positions[min(knee, quantiles - 1)] * (n - 1))) if knee else None
+
+
+def _knee_eps(sorted_distances: np.ndarray) -> Optional[float]:
+    knee = _curve_knee(sorted_distances, trimmed=True)
+    return float(sorted_distances[knee]) if knee else None
+
+
+def _weighted_kth_distances(distances: np.ndarray, indices: np.ndarray,
+                            sample_weight: np.ndarray, k: int) -> np.ndarray:
+    """k-th neighbor distance of each query when neighbor j counts sample_weight[j] times."""
+    cumulative = np.cumsum(sample_weight[indices], axis=1)
+    return distances[np.arange(len(distances)), np.argmax(cumulative >= k, axis=1)]
+
+
+class KDistanceProfile:
+    """
+    k-nearest-neighbor distances of every point, computed once at the largest
+    k a request needs and shared by the eps search, the k-distance plot and
+    anything else that wants the neighbor lists.
+    """
+
+    def __init__(self, distances: np.ndarray, indices: np.ndarray, sample_weight: Optional[np.ndarray] = None):
+        self.distances = distances
+        self.indices = indices
+        self.sample_weight = sample_weight
+        self._curves: Dict[int, np.ndarray] = {}
+        self._knees: Dict[int, Optional[int]] = {}
+
+    @classmethod
+    def compute(cls, scaled_features: np.ndarray, k: int,
+                sample_weight: Optional[np.ndarray] = None) -> 'KDistanceProfile':
+        """
+        With sample_weight, each row stands for that many identical points.
+        Every point has weight >= 1, so k distinct neighbors always cover
+        the k nearest of the expanded data.
+        """
+        from sklearn.neighbors import NearestNeighbors
+        nbrs = NearestNeighbors(n_neighbors=k if sample_weight is None else min(k, len(scaled_features)))
+        nbrs.fit(scaled_features)
+        distances, indices = nbrs.kneighbors(scaled_features)
+        return cls(distances, indices, sample_weight)
+
+    @property
+    def max_k(self) -> int:
+        if self.sample_weight is not None and self.distances.shape[1] == len(self.distances):
+            return int(self.sample_weight.sum())
+        return self.distances.shape[1]
+
+    def curve(self, k: int) -> np.ndarray:
+        """Sorted k-th neighbor distances (the k-distance graph), one per point of the expanded data."""
+        if k > self.max_k:
+            raise ValueError(f"Profile was computed for k<={self.max_k}, got k={k}")
+        if k not in self._curves:
+            if self.sample_weight is None:
+                self._curves[k] = np.sort(self.distances[:, k - 1])
+            else:
+                distances = _weighted_kth_distances(self.distances, self.indices, self.sample_weight, k)
+                self._curves[k] = np.sort(np.repeat(distances, self.sample_weight))
+        return self._curves[k]
+
+    def knee(self, k: int) -> Optional[int]:
+        if k not in self._knees:
+            self._knees[k] = _curve_knee(self.curve(k), trimmed=EPS_KNEE_CURVE == 'trimmed')
+        return self._knees[k]
+
+    def eps(self, k: int, default: float = DEFAULT_EPS) -> float:
+        knee = self.knee(k)
+        return self.curve(k)[knee] if knee else default
 
 
 class ParameterOptimizer:
     @staticmethod
-    def find_optimal_eps(scaled_features: np.ndarray, min_samples: int = 2) -> float:
+    def find_optimal_eps(scaled_features: np.ndarray, min_samples: int = 2,
+                         profile: Optional[KDistanceProfile] = None,
+                         sample_weight: Optional[np.ndarray] = None) -> float:
         try:
-            nbrs = NearestNeighbors(n_neighbors=min_samples)
-            nbrs.fit(scaled_features)
-            distances, _ = nbrs.kneighbors(scaled_features)
-            
-            distances = np.sort(distances[:, -1])
-            
-            kneedle = KneeLocator(
-                range(1, len(distances) + 1),
-                distances,
-                curve='convex',
-                direction='increasing'
-            )
-            
-            return distances[kneedle.knee] if kneedle.knee else 0.5
+            if profile is None and ParameterOptimizer.should_sample_eps(len(scaled_features)):
+                return ParameterOptimizer.estimate_eps(scaled_features, min_samples, sample_weight=sample_weight)['eps']
+            if profile is None or profile.max_k < min_samples:
+                profile = KDistanceProfile.compute(scaled_features, min_samples, sample_weight)
+            return profile.eps(min_samples)
         except Exception:
-            return 0.5
+            return DEFAULT_EPS
+    
+    @staticmethod
+    def estimate_eps(scaled_features: np.ndarray, min_samples: int = 2,
+                     sample_size: int = None, bootstrap_rounds: int = EPS_BOOTSTRAP_ROUNDS,
+                     random_state: int = 0, sample_weight: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        """
+        Estimates eps from a sample instead of every point.
+
+        Points are stratified by their distance to the centroid, so sparse
+        outskirts and the dense core are both represented. Each sampled
+        point is queried against an index over the full data, which keeps
+        its k-distance exact. The knee is located on a quantile-compressed
+        curve with the top tail trimmed, since a sample cannot pin down the
+        few outliers at the very top. A bootstrap over the sampled
+        distances, resampled within strata, gives a confidence interval for
+        the knee of that trimmed curve on the full data. It is the exact
+        eps only with EPS_KNEE_CURVE=trimmed; the full-curve knee of the
+        default exact search is driven by those outliers and can be far
+        larger.
+        
+        With sample_weight, each row stands for that many identical points
+        and the sample is drawn from the expanded data.
+        """
+        from sklearn.neighbors import NearestNeighbors
+        
+        # Row of the (possibly weighted) input behind each point of the expanded data
+        if sample_weight is None:
+            points = np.arange(len(scaled_features))
+        else:
+            points = np.repeat(np.arange(len(scaled_features)), sample_weight)
+        n_samples = len(points)
+        sample_size = min(n_samples, sample_size or EPS_SAMPLE_SIZE)
+        rng = np.random.default_rng(random_state)
+        
+        radius = np.linalg.norm(scaled_features - np.average(scaled_features, axis=0, weights=sample_weight), axis=1)[points]
+        edges = np.quantile(radius, np.linspace(0, 1, EPS_STRATA + 1)[1:-1])
+        strata = np.digitize(radius, edges)
+        sample = np.concatenate([
+            rng.choice(members, size=max(1, round(sample_size * len(members) / n_samples)), replace=False)
+            for members in (np.flatnonzero(strata == s) for s in range(EPS_STRATA)) if len(members)
+        ])
+        
+        if sample_weight is None:
+            nbrs = NearestNeighbors(n_neighbors=min_samples).fit(scaled_features)
+            distances = nbrs.kneighbors(scaled_features[sample])[0][:, min_samples - 1]
+        else:
+            nbrs = NearestNeighbors(n_neighbors=min(min_samples, len(scaled_features))).fit(scaled_features)
+            distances = _weighted_kth_distances(*nbrs.kneighbors(scaled_features[points[sample]]), sample_weight, min_samples)
+        eps = _knee_eps(np.sort(distances))
+        
+        sample_strata = strata[sample]
+        by_stratum = [distances[sample_strata == s] for s in np.unique(sample_strata)]
+        estimates = []
+        for _ in range(bootstrap_rounds):
+            checkpoint('eps_search')
+            resampled = np.concatenate([rng.choice(group, size=len(group)) for group in by_stratum])
+            estimate = _knee_eps(np.sort(resampled))
+            if estimate is not None:
+                estimates.append(estimate)
+        
+        tail = (1 - EPS_CONFIDENCE) / 2 * 100
+        ci = [float(np.percentile(estimates, tail)), float(np.percentile(estimates, 100 - tail))] if estimates else None
+        return {
+            'eps': eps if eps is not None else DEFAULT_EPS,
+            'method': 'sampled',
+            'sample_size': int(len(sample)),
+            'confidence': EPS_CONFIDENCE,
+            'ci': ci,
+            'knee_curve': 'trimmed',
+            'exact_knee_curve': EPS_KNEE_CURVE
+        }
+
+    @staticmethod
+    def estimate_graph_entries(nbrs, scaled_features: np.ndarray, eps_values: Sequence[float]) -> np.ndarray:
+        """
+        Estimated number of stored neighbor pairs (self excluded) of the
+        radius graph at each of the sorted eps_values, from a sample of rows
+        queried at the largest eps in small batches.
+        """
+        n_samples = len(scaled_features)
+        sample = np.random.default_rng(0).choice(n_samples, size=min(n_samples, SWEEP_ESTIMATE_SAMPLE), replace=False)
+        batch = max(1, SWEEP_ESTIMATE_BATCH // n_samples)
+        counts = np.zeros(len(eps_values), dtype=np.int64)
+        for start in range(0, len(sample), batch):
+            distances = nbrs.radius_neighbors(scaled_features[sample[start:start + batch]])[0]
+            counts += np.searchsorted(np.sort(np.concatenate(distances)), eps_values, side='right')
+        return (counts - len(sample)) * (n_samples / len(sample))
+    
+    @staticmethod
+    def sweep(scaled_features: np.ndarray, eps_values: Sequence[float],
+              min_samples_values: Sequence[int]) -> List[Dict[str, Any]]:
+        """
+        Evaluates DBSCAN over an (eps, min_samples) grid. The radius-neighbors
+        graph is built once at the largest eps and sorted by distance within
+        each row. Each eps cuts every row at its first entry beyond eps, which
+        keeps the rows sorted, so DBSCAN in precomputed mode neither warns
+        nor re-sorts the graph. No neighbor search is repeated per grid point.
+        
+        At a large eps in standardized space the graph is close to complete,
+        so its size is estimated from a sample first; a grid whose graph would
+        exceed SWEEP_MAX_GRAPH_ENTRIES raises ValueError.
+        """
+        from scipy.sparse import csr_matrix
+        from sklearn.cluster import DBSCAN
+        from sklearn.metrics import silhouette_score
+        from sklearn.neighbors import NearestNeighbors, sort_graph_by_row_values
+        
+        n_samples = len(scaled_features)
+        eps_values = sorted(set(eps_values))
+        nbrs = NearestNeighbors(radius=eps_values[-1]).fit(scaled_features)
+        entries = ParameterOptimizer.estimate_graph_entries(nbrs, scaled_features, eps_values)
+        if entries[-1] > SWEEP_MAX_GRAPH_ENTRIES:
+            fitting = [eps for eps, size in zip(eps_values, entries) if size <= SWEEP_MAX_GRAPH_ENTRIES]
+            raise ValueError(
+                f"A sweep up to eps={eps_values[-1]:g} needs a neighbor graph of about {entries[-1]:,.0f} pairs, "
+                f"over the limit of {SWEEP_MAX_GRAPH_ENTRIES:,}; "
+                + (f"lower the largest eps to {fitting[-1]:g} or less" if fitting else "use smaller eps values")
+            )
+        
+        # X=None queries the fitted rows without counting each row as its own neighbor
+        graph = nbrs.radius_neighbors_graph(None, mode='distance')
+        graph = sort_graph_by_row_values(graph, copy=False, warn_when_not_sorted=False)
+        nonempty = np.diff(graph.indptr) > 0
+        
+        results = []
+        for eps in eps_values:
+            mask = graph.data <= eps
+            # Rows are sorted by distance, so the kept entries of each row are a prefix of it
+            counts = np.zeros(n_samples, dtype=graph.indptr.dtype)
+            counts[nonempty] = np.add.reduceat(mask, graph.indptr[:-1][nonempty], dtype=graph.indptr.dtype)
+            indptr = np.concatenate([[0], np.cumsum(counts)])
+            thresholded = csr_matrix((graph.data[mask], graph.indices[mask], indptr), shape=graph.shape)
+            for min_samples in sorted(set(min_samples_values)):
+                checkpoint('sweep')
+                labels = DBSCAN(eps=eps, min_samples=min_samples, metric='precomputed').fit_predict(thresholded)
+                clustered = labels != -1
+                n_clusters = len(np.unique(labels[clustered]))
+                
+                silhouette = None
+                if 2 <= n_clusters < clustered.sum():
+                    silhouette = float(silhouette_score(
+                        scaled_features[clustered], labels[clustered],
+                        sample_size=min(int(clustered.sum()), SILHOUETTE_SAMPLE_SIZE),
+                        random_state=0
+                    ))
+                
+                n_noise = int(n_samples - clustered.sum())
+                results.append({
+                    'eps': float(eps),
+                    'min_samples': int(min_samples),
+                    'n_clusters': int(n_clusters),
+                    'n_noise': n_noise,
+                    'noise_ratio': n_noise / n_samples,
+                    'silhouette': silhouette
+                })
+        return results
+    
+    @staticmethod
+    def should_sample_eps(n_samples: int) -> bool:
+        return n_samples > EPS_SAMPLE_THRESHOLD
     
     @staticmethod
     def find_optimal_min_samples(n_samples: int) -> int:
@@ -1,17 +1,117 @@
+import json
+import os
+import tempfile
+import numpy as np
 import pandas as pd
-from sklearn.preprocessing import StandardScaler
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
+from typing import Any, Dict, List
+from .instrumentation import stage
+
+
+# Bump when the columns or meaning of the feature frames change
+FEATURE_SCHEMA_VERSION = 1
+SNAPSHOT_METADATA_KEY = b'dbscan_features'
+
+# Opt-in: hold features as one float32 matrix and scale it in place
+COMPACT_FEATURES = os.getenv("COMPACT_FEATURES", "false").lower() in ("1", "true", "yes")
+
+
+def write_feature_snapshot(df: pd.DataFrame, path: str, **metadata: Any) -> None:
+    """Writes a feature frame to Parquet with the schema version and metadata, atomically."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    info = json.dumps({'schema_version': FEATURE_SCHEMA_VERSION, **metadata})
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), SNAPSHOT_METADATA_KEY: info.encode()})
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.parquet')
+    os.close(fd)
+    try:
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def read_feature_snapshot_metadata(path: str) -> Dict[str, Any]:
+    """Reads the snapshot metadata from the Parquet footer without touching the data."""
+    import pyarrow.parquet as pq
+    
+    metadata = pq.read_schema(path).metadata or {}
+    if SNAPSHOT_METADATA_KEY not in metadata:
+        raise ValueError(f"{path} is not a feature snapshot")
+    info = json.loads(metadata[SNAPSHOT_METADATA_KEY])
+    if info.get('schema_version') != FEATURE_SCHEMA_VERSION:
+        raise ValueError(
+            f"{path} has feature schema version {info.get('schema_version')}, expected {FEATURE_SCHEMA_VERSION}; re-export it"
+        )
+    return info
+
+
+def feature_matrix(df: pd.DataFrame, feature_columns: List[str], dtype=np.float32) -> np.ndarray:
+    """
+    Copies the feature columns straight into one C-contiguous matrix, a
+    column at a time, with missing values as 0. No intermediate frame is built.
+    """
+    matrix = np.empty((len(df), len(feature_columns)), dtype=dtype)
+    for j, col in enumerate(feature_columns):
+        column = matrix[:, j]
+        column[:] = df[col].to_numpy(dtype=dtype, na_value=np.nan)
+        column[np.isnan(column)] = 0
+    return matrix
+
+
+class FeatureScaler:
+    """
+    Standardizes features as sklearn's StandardScaler does (population std,
+    constant columns centered but not scaled) and exposes the same mean_ and
+    scale_.
+
+    By default it runs StandardScaler on the feature columns. In compact
+    mode it builds one float32 matrix with feature_matrix and scales it in
+    place, so the neighbor search receives that matrix without further
+    copies. The statistics are still accumulated in float64.
+    """
+
+    def __init__(self, compact: bool = None):
+        self.compact = COMPACT_FEATURES if compact is None else compact
+        self.mean_ = None
+        self.scale_ = None
+    
+    def fit_transform(self, df: pd.DataFrame, feature_columns: List[str]) -> np.ndarray:
+        if not self.compact:
+            features = df[feature_columns]
+            
+            if features.isnull().any().any():
+                features = features.fillna(0)
+            
+            from sklearn.preprocessing import StandardScaler
+            scaler = StandardScaler()
+            scaled = scaler.fit_transform(features)
+            self.mean_, self.scale_ = scaler.mean_, scaler.scale_
+            return scaled
+        
+        matrix = feature_matrix(df, feature_columns)
+        self.mean_ = np.array([matrix[:, j].mean(dtype=np.float64) for j in range(matrix.shape[1])])
+        self.scale_ = np.array([matrix[:, j].std(dtype=np.float64) for j in range(matrix.shape[1])])
+        self.scale_[self.scale_ < 10 * np.finfo(np.float64).eps] = 1.0
+        matrix -= self.mean_.astype(matrix.dtype)
+        matrix /= self.scale_.astype(matrix.dtype)
+        return matrix
 
 
 class DataPreprocessor:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session = None, name: str = None):
         self.db = db
-        self.scaler = StandardScaler()
+        self.name = name
+        self.scaler = None
     
-    def load_and_clean(self, query: str) -> pd.DataFrame:
-        df = pd.read_sql(query, self.db.connection())
-        
+    @staticmethod
+    def _clean(df: pd.DataFrame) -> pd.DataFrame:
         if df.empty:
             raise ValueError("Query returned no data")
         
@@ -20,11 +120,27 @@ class DataPreprocessor:
         
         return df
     
-    def scale_features(self, df: pd.DataFrame, feature_columns: list) -> pd.DataFrame:
-        features = df[feature_columns]
+    def load_and_clean(self, query: str) -> pd.DataFrame:
+        with stage('sql', self.name):
+            df = pd.read_sql(query, self.db.connection())
         
-        if features.isnull().any().any():
-            features = features.fillna(0)
+        return self._clean(df)
+    
+    def load_snapshot(self, path: str, columns: List[str] = None) -> pd.DataFrame:
+        """
+        Loads a feature frame from a Parquet snapshot instead of the database.
+        Only the requested columns are read, and the file is memory-mapped.
+        """
+        import pyarrow.parquet as pq
         
-        scaled = self.scaler.fit_transform(features)
-        return pd.DataFrame(scaled, columns=feature_columns, index=df.index)
+        read_feature_snapshot_metadata(path)
+        with stage('snapshot', self.name):
+            df = pq.read_table(path, columns=columns, memory_map=True).to_pandas()
+        
+        return self._clean(df)
+    
+    def scale_features(self, df: pd.DataFrame, feature_columns: list, compact: bool = None) -> pd.DataFrame:
+        if self.scaler is None:
+            self.scaler = FeatureScaler(compact)
+        scaled = self.scaler.fit_transform(df, feature_columns)
+        return pd.DataFrame(scaled, columns=feature_columns, index=df.index, copy=False)
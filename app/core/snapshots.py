@@ -0,0 +1,166 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+import numpy as np
+from .clustering import ClusterResult
+
+
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_ARRAYS = ('labels', 'scaled_features', 'core_sample_indices', 'scaler_mean', 'scaler_scale')
+POINTER = 'CURRENT'
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _restore_stats(cluster_stats: Dict[str, Any]) -> Dict[str, Any]:
+    # JSON object keys are strings; cluster labels are integers
+    return {
+        column: {stat: {int(label): value for label, value in values.items()} for stat, values in stats.items()}
+        for column, stats in cluster_stats.items()
+    }
+
+
+def _restore_summary(cluster_summary: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if cluster_summary is None:
+        return None
+    return {key: {int(label): value for label, value in values.items()} for key, values in cluster_summary.items()}
+
+
+class ResultSnapshotStore:
+    """
+    Fitted clustering results as versioned, memory-mappable snapshots.
+
+    Each (dataset, parameters) slot holds immutable version directories.
+    A version contains the arrays as .npy files, the member frame as an
+    Arrow IPC file, and the params and cluster_stats as meta.json. A
+    CURRENT file names the newest version. It is replaced atomically, so
+    readers switch to a new version on their next lookup and never see a
+    partial write. Readers map the files instead of loading them, so any
+    number of worker processes share one copy through the page cache.
+    """
+
+    def __init__(self, directory: str, keep: int = 2):
+        self.directory = directory
+        self.keep = keep
+        self._open: Dict[str, Tuple[str, str, ClusterResult]] = {}
+        self._lock = threading.Lock()
+
+    def slot(self, dataset: str, eps: float = None, min_samples: int = None) -> str:
+        name = 'default' if eps is None and min_samples is None else f'eps={eps}_min_samples={min_samples}'
+        return os.path.join(self.directory, dataset, name)
+
+    @contextmanager
+    def writer_lock(self, dataset: str, eps: float = None, min_samples: int = None) -> Iterator[None]:
+        """Serializes fits of one slot across processes, so only one worker computes it."""
+        import fcntl
+        slot = self.slot(dataset, eps, min_samples)
+        os.makedirs(slot, exist_ok=True)
+        with open(os.path.join(slot, '.lock'), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def write(self, dataset: str, result: ClusterResult, data_version: str,
+              eps: float = None, min_samples: int = None) -> str:
+        """Writes a new version, points CURRENT at it and returns its name."""
+        import pyarrow as pa
+
+        slot = self.slot(dataset, eps, min_samples)
+        os.makedirs(slot, exist_ok=True)
+        version = str(time.time_ns())
+        tmp_dir = tempfile.mkdtemp(dir=slot, prefix='.tmp-')
+        try:
+            for name in SNAPSHOT_ARRAYS:
+                np.save(os.path.join(tmp_dir, f'{name}.npy'), np.ascontiguousarray(getattr(result, name)))
+            table = pa.Table.from_pandas(result.frame, preserve_index=False)
+            with pa.OSFile(os.path.join(tmp_dir, 'frame.arrow'), 'wb') as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            meta = {
+                'format': SNAPSHOT_FORMAT,
+                'name': result.name,
+                'feature_columns': result.feature_columns,
+                'params': result.params,
+                'cluster_stats': result.cluster_stats,
+                'cluster_summary': result.cluster_summary,
+                'data_version': data_version,
+                'created_at': time.time(),
+            }
+            with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+                json.dump(meta, f, default=_json_default)
+            os.rename(tmp_dir, os.path.join(slot, version))
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        fd, tmp_pointer = tempfile.mkstemp(dir=slot, prefix='.tmp-')
+        with os.fdopen(fd, 'w') as f:
+            f.write(version)
+        os.replace(tmp_pointer, os.path.join(slot, POINTER))
+        self._prune(slot)
+        return version
+
+    def _prune(self, slot: str) -> None:
+        # Older versions stay readable by processes that still map them; on POSIX
+        # unlinking a mapped file only drops the name
+        versions = sorted((entry for entry in os.listdir(slot) if entry.isdigit()), key=int)
+        for version in versions[:-self.keep]:
+            shutil.rmtree(os.path.join(slot, version), ignore_errors=True)
+
+    def current_version(self, dataset: str, eps: float = None, min_samples: int = None) -> Optional[str]:
+        try:
+            with open(os.path.join(self.slot(dataset, eps, min_samples), POINTER)) as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _load(path: str) -> Tuple[str, ClusterResult]:
+        import pyarrow as pa
+
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r') for name in SNAPSHOT_ARRAYS}
+        # The table keeps the mapping alive; split_blocks lets numeric columns stay zero-copy
+        table = pa.ipc.open_file(pa.memory_map(os.path.join(path, 'frame.arrow'))).read_all()
+        result = ClusterResult(
+            name=meta['name'],
+            frame=table.to_pandas(split_blocks=True),
+            cluster_stats=_restore_stats(meta['cluster_stats']),
+            cluster_summary=_restore_summary(meta.get('cluster_summary')),
+            params=meta['params'],
+            feature_columns=meta['feature_columns'],
+            **arrays
+        )
+        return meta['data_version'], result
+
+    def read(self, dataset: str, data_version: str, eps: float = None,
+             min_samples: int = None) -> Optional[ClusterResult]:
+        """Returns the current snapshot if it was fitted on data_version, otherwise None."""
+        slot = self.slot(dataset, eps, min_samples)
+        version = self.current_version(dataset, eps, min_samples)
+        if version is None:
+            return None
+        with self._lock:
+            opened = self._open.get(slot)
+        if opened is None or opened[0] != version:
+            try:
+                opened = (version, *self._load(os.path.join(slot, version)))
+            except FileNotFoundError:
+                # Pruned between reading CURRENT and opening it
+                return None
+            with self._lock:
+                self._open[slot] = opened
+        _, snapshot_version, result = opened
+        return result if snapshot_version == data_version else None
@@ -1,38 +1,119 @@
+import io
+import os
 import numpy as np
-import matplotlib.pyplot as plt
-from sklearn.neighbors import NearestNeighbors
-from kneed import KneeLocator
+from typing import Sequence
+from .optimization import KDistanceProfile
+
+
+# Above this many points, cluster plots switch from one marker per point to binned density
+DENSITY_THRESHOLD = int(os.getenv("PLOT_DENSITY_THRESHOLD", "20000"))
+HEXBIN_GRIDSIZE = 60
+VOXEL_BINS = 24
+# The k-distance curve is drawn through at most this many evenly spaced points
+MAX_CURVE_POINTS = 5000
+
+
+def _png(fig) -> bytes:
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png')
+    return buffer.getvalue()
+
+
+def _cluster_color(cmap, label: int):
+    return cmap(label % cmap.N)
 
 
 class ClusterVisualizer:
+    """
+    Renders figures with matplotlib's object-oriented API on the Agg backend.
+    matplotlib is imported on first use so the clustering path never loads it.
+    """
+
+    @staticmethod
+    def render_k_distance(profile: KDistanceProfile, name: str, min_samples: int = 2) -> bytes:
+        from matplotlib.figure import Figure
+        
+        distances = profile.curve(min_samples)
+        
+        fig = Figure(figsize=(10, 6))
+        ax = fig.subplots()
+        if len(distances) > MAX_CURVE_POINTS:
+            index = np.linspace(0, len(distances) - 1, MAX_CURVE_POINTS).astype(np.int64)
+            ax.plot(index, distances[index])
+        else:
+            ax.plot(distances)
+        ax.set_title(f'K-Distance Graph for {name.capitalize()} Data')
+        ax.set_xlabel('Point Index')
+        ax.set_ylabel(f'{min_samples}-neighbor distance')
+        
+        knee = profile.knee(min_samples)
+        
+        if knee:
+            ax.axvline(x=knee, color='r', linestyle='--', 
+                       label=f'Optimal eps={distances[knee]:.2f}')
+            ax.legend()
+        
+        return _png(fig)
+    
     @staticmethod
-    def plot_k_distance(scaled_features: np.ndarray, name: str, min_samples: int = 2) -> None:
-        try:
-            nbrs = NearestNeighbors(n_neighbors=min_samples)
-            nbrs.fit(scaled_features)
-            distances, _ = nbrs.kneighbors(scaled_features)
-            
-            distances = np.sort(distances[:, -1])
-            
-            plt.figure(figsize=(10, 6))
-            plt.plot(distances)
-            plt.title(f'K-Distance Graph for {name.capitalize()} Data')
-            plt.xlabel('Point Index')
-            plt.ylabel(f'{min_samples}-neighbor distance')
-            
-            kneedle = KneeLocator(
-                range(1, len(distances) + 1),
-                distances,
-                curve='convex',
-                direction='increasing'
-            )
-            
-            if kneedle.knee:
-                plt.axvline(x=kneedle.knee, color='r', linestyle='--', 
-                           label=f'Optimal eps={distances[kneedle.knee]:.2f}')
-                plt.legend()
-            
-            plt.savefig(f'{name}_k_distance.png')
-            plt.close()
-        except Exception:
-            pass
+    def render_clusters(points: np.ndarray, labels: np.ndarray, axes: Sequence[str], title: str,
+                        density_threshold: int = None) -> bytes:
+        """
+        Renders a 2D or 3D cluster plot of points (one column per axis).
+        
+        Up to density_threshold points, every point is drawn, colored by
+        cluster. Beyond it, clustered points are binned: a log-scaled hexbin
+        in 2D with each cluster's centroid marked, and voxel markers sized by
+        count in 3D. Either way outliers are drawn individually, so the cost
+        of rendering stays bounded by the number of bins and outliers.
+        """
+        from matplotlib import colormaps
+        from matplotlib.figure import Figure
+        
+        threshold = DENSITY_THRESHOLD if density_threshold is None else density_threshold
+        three_d = points.shape[1] == 3
+        cmap = colormaps['tab20']
+        outliers = labels == -1
+        clustered = ~outliers
+        
+        fig = Figure(figsize=(12, 8))
+        ax = fig.add_subplot(projection='3d' if three_d else None)
+        
+        if len(points) <= threshold:
+            for label in np.unique(labels[clustered]):
+                members = points[labels == label]
+                ax.scatter(*members.T, s=30, color=_cluster_color(cmap, label), label=f'Cluster {label}')
+        elif three_d:
+            cluster_points = points[clustered]
+            low, high = cluster_points.min(axis=0), cluster_points.max(axis=0)
+            width = np.where(high > low, (high - low) / VOXEL_BINS, 1.0)
+            voxels = np.minimum(((cluster_points - low) // width).astype(np.int64), VOXEL_BINS - 1)
+            keys, counts = np.unique(np.column_stack([voxels, labels[clustered]]), axis=0, return_counts=True)
+            centers = low + (keys[:, :3] + 0.5) * width
+            ax.scatter(*centers.T, s=10 + 20 * np.log1p(counts), alpha=0.6,
+                       color=[_cluster_color(cmap, label) for label in keys[:, 3]])
+        else:
+            cluster_points, cluster_labels = points[clustered], labels[clustered]
+            collection = ax.hexbin(*cluster_points.T, gridsize=HEXBIN_GRIDSIZE, bins='log', cmap='Greys', mincnt=1)
+            fig.colorbar(collection, ax=ax, label='Points per bin')
+            found, inverse, sizes = np.unique(cluster_labels, return_inverse=True, return_counts=True)
+            centroids = np.column_stack([
+                np.bincount(inverse, weights=column) / sizes for column in cluster_points.T
+            ]) if len(found) else np.empty((0, 2))
+            for label, centroid in zip(found, centroids):
+                ax.scatter(*centroid, s=120, marker='o', edgecolors='black', color=_cluster_color(cmap, label))
+                ax.annotate(str(label), centroid, textcoords='offset points', xytext=(6, 6))
+        
+        if outliers.any():
+            ax.scatter(*points[outliers].T, s=20, marker='x', color='red', label='Outliers')
+        
+        ax.set_title(title)
+        ax.set_xlabel(axes[0])
+        ax.set_ylabel(axes[1])
+        if three_d:
+            ax.set_zlabel(axes[2])
+        handles, _ = ax.get_legend_handles_labels()
+        if 0 < len(handles) <= 21:
+            ax.legend()
+        
+        return _png(fig)
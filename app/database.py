@@ -1,4 +1,6 @@
-from sqlalchemy import create_engine
+import threading
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
@@ -6,27 +8,58 @@ import os
 
 load_dotenv()
 
-DATABASE_URL = os.getenv("DATABASE_URL")
+Base = declarative_base()
 
-if not DATABASE_URL:
-    raise ValueError("DATABASE_URL environment variable is not set. Please check your .env file.")
+_engine = None
+_session_factory = None
+_engine_lock = threading.Lock()
 
-try:
-    engine = create_engine(DATABASE_URL)
-    connection = engine.connect()
-    connection.close()
-    print("Database connection successful!")
-except Exception as e:
-    print(f"Database connection error: {str(e)}")
-    raise
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def get_pool_options() -> dict:
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes"),
+    }
+
+
+def get_engine() -> Engine:
+    """Creates the engine on first use; importing this module never connects."""
+    global _engine, _session_factory
+    with _engine_lock:
+        if _engine is None:
+            database_url = os.getenv("DATABASE_URL")
+            if not database_url:
+                raise ValueError("DATABASE_URL environment variable is not set. Please check your .env file.")
+            _engine = create_engine(database_url, **get_pool_options())
+            _session_factory = sessionmaker(autocommit=False, autoflush=False, bind=_engine)
+        return _engine
+
+
+def SessionLocal():
+    get_engine()
+    return _session_factory()
+
+
+def check_connection() -> None:
+    with get_engine().connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+
+def dispose_engine() -> None:
+    global _engine, _session_factory
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose()
+        _engine = None
+        _session_factory = None
 
-Base = declarative_base()
 
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
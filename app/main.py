@@ -1,25 +1,65 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, Header, HTTPException, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import Dict, Any
-from .database import get_db
-from .models.customer_clustering import analyze_customer_clusters
-from .models.product_clustering import analyze_product_clusters
-from .models.supplier_clustering import analyze_supplier_clusters
-from .models.country_clustering import analyze_country_clusters
+from typing import Dict, Any, Optional
+from contextlib import asynccontextmanager
+from .database import get_db, check_connection, dispose_engine
+from .models.datasets import get_dataset
+from .models.combined_clustering import analyze_all_clusters, shutdown_executor
+from .api.plots import get_k_distance_png
+from .api.windows import TimeWindow, get_windowed_cluster_response
+from .api.responses import ResponseOptions, render_cluster_response
+from .api.sweep import run_sweep
+from .api.executor import run_blocking, analysis_executor
+from .api.assignment import AssignRequest, assign_points, fit_model
+from .api.jobs import JobRequest, JobQueueFull, job_manager, job_events
+from .core.instrumentation import ServerTimingMiddleware, metrics
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The engine is created lazily on first use; only clean up here
+    yield
+    job_manager.shutdown()
+    analysis_executor.shutdown(wait=False, cancel_futures=True)
+    shutdown_executor()
+    dispose_engine()
 
 app = FastAPI(
     title="DBSCAN Sales Analysis API",
-    description="Sales data analysis and segmentation using DBSCAN"
+    description="Sales data analysis and segmentation using DBSCAN",
+    lifespan=lifespan
 )
+app.add_middleware(ServerTimingMiddleware)
 
 @app.get("/")
 async def root():
     return {"message": "Welcome to DBSCAN Sales Analysis API"}
 
+@app.get("/ready")
+async def ready():
+    """
+    Readiness probe. Returns 200 once the database is reachable, 503 otherwise.
+    """
+    try:
+        await run_blocking(check_connection)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Database unavailable: {e}")
+    return {"status": "ready"}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Prometheus metrics: per-dataset stage duration histograms, row counts,
+    peak memory and result cache hits.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/api/customers/clusters", response_model=Dict[str, Any])
 async def get_customer_clusters(
     eps: float = None,
     min_samples: int = None,
+    options: ResponseOptions = Depends(),
+    time_window: TimeWindow = Depends(),
     db: Session = Depends(get_db)
 ):
     """
@@ -28,13 +68,22 @@ async def get_customer_clusters(
     Parameters:
     - eps: DBSCAN epsilon parameter
     - min_samples: DBSCAN minimum samples parameter
+    - format: json (default), columnar, ndjson or arrow
+    - include_members: false returns only stats, params and outlier indices
+    - limit, offset: page through members
+    - from, to: only orders dated in this range (inclusive)
+    - window, step: rolling windows of `window` days, `step` days apart (JSON only)
     
     Returns:
     - Customer clusters and statistics
+    - Cache status (hit, age_seconds, data_version)
+    - In rolling mode, a summary per window and the label changes between consecutive windows
     """
     try:
-        results = analyze_customer_clusters(db, eps, min_samples)
+        results = await run_blocking(get_windowed_cluster_response, 'customers', db, eps, min_samples, options, time_window)
         return results
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -42,6 +91,8 @@ async def get_customer_clusters(
 async def get_product_clusters(
     eps: float = None,
     min_samples: int = None,
+    options: ResponseOptions = Depends(),
+    time_window: TimeWindow = Depends(),
     db: Session = Depends(get_db)
 ):
     """
@@ -50,13 +101,22 @@ async def get_product_clusters(
     Parameters:
     - eps: DBSCAN epsilon parameter
     - min_samples: DBSCAN minimum samples parameter
+    - format: json (default), columnar, ndjson or arrow
+    - include_members: false returns only stats, params and outlier indices
+    - limit, offset: page through members
+    - from, to: only orders dated in this range (inclusive)
+    - window, step: rolling windows of `window` days, `step` days apart (JSON only)
     
     Returns:
     - Product clusters and statistics
+    - Cache status (hit, age_seconds, data_version)
+    - In rolling mode, a summary per window and the label changes between consecutive windows
     """
     try:
-        results = analyze_product_clusters(db, eps, min_samples)
+        results = await run_blocking(get_windowed_cluster_response, 'products', db, eps, min_samples, options, time_window)
         return results
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -64,6 +124,8 @@ async def get_product_clusters(
 async def get_supplier_clusters(
     eps: float = None,
     min_samples: int = None,
+    options: ResponseOptions = Depends(),
+    time_window: TimeWindow = Depends(),
     db: Session = Depends(get_db)
 ):
     """
@@ -72,13 +134,22 @@ async def get_supplier_clusters(
     Parameters:
     - eps: DBSCAN epsilon parameter
     - min_samples: DBSCAN minimum samples parameter
+    - format: json (default), columnar, ndjson or arrow
+    - include_members: false returns only stats, params and outlier indices
+    - limit, offset: page through members
+    - from, to: only orders dated in this range (inclusive)
+    - window, step: rolling windows of `window` days, `step` days apart (JSON only)
     
     Returns:
     - Supplier clusters and statistics
+    - Cache status (hit, age_seconds, data_version)
+    - In rolling mode, a summary per window and the label changes between consecutive windows
     """
     try:
-        results = analyze_supplier_clusters(db, eps, min_samples)
+        results = await run_blocking(get_windowed_cluster_response, 'suppliers', db, eps, min_samples, options, time_window)
         return results
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -86,6 +157,8 @@ async def get_supplier_clusters(
 async def get_country_clusters(
     eps: float = None,
     min_samples: int = None,
+    options: ResponseOptions = Depends(),
+    time_window: TimeWindow = Depends(),
     db: Session = Depends(get_db)
 ):
     """
@@ -94,16 +167,229 @@ async def get_country_clusters(
     Parameters:
     - eps: DBSCAN epsilon parameter
     - min_samples: DBSCAN minimum samples parameter
+    - format: json (default), columnar, ndjson or arrow
+    - include_members: false returns only stats, params and outlier indices
+    - limit, offset: page through members
+    - from, to: only orders dated in this range (inclusive)
+    - window, step: rolling windows of `window` days, `step` days apart (JSON only)
     
     Returns:
     - Country clusters and statistics
+    - Cache status (hit, age_seconds, data_version)
+    - In rolling mode, a summary per window and the label changes between consecutive windows
     """
     try:
-        results = analyze_country_clusters(db, eps, min_samples)
+        results = await run_blocking(get_windowed_cluster_response, 'countries', db, eps, min_samples, options, time_window)
         return results
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/clusters/all", response_model=Dict[str, Any])
+async def get_all_clusters(db: Session = Depends(get_db)):
+    """
+    Returns clustering results for all four datasets.
+    
+    Order lines are read once in a single snapshot, the four feature sets are
+    derived from them in pandas and fitted concurrently in a process pool.
+    
+    Returns:
+    - Results keyed by customers, products, suppliers and countries
+    """
+    try:
+        return await run_blocking(analyze_all_clusters, db)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/{dataset}/fit", response_model=Dict[str, Any])
+async def fit_cluster_model(
+    dataset: str,
+    eps: float = None,
+    min_samples: int = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Fits a dataset and persists the model used by the assign endpoint.
+    
+    Parameters:
+    - dataset: customers, products, suppliers or countries
+    - eps: DBSCAN epsilon parameter
+    - min_samples: DBSCAN minimum samples parameter
+    
+    Returns:
+    - Summary of the persisted model
+    """
+    try:
+        get_dataset(dataset)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    try:
+        return await run_blocking(fit_model, dataset, db, eps, min_samples)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/{dataset}/assign", response_model=Dict[str, Any])
+async def assign_cluster_labels(
+    dataset: str,
+    request: AssignRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Labels new entities against the persisted model without re-clustering.
+    
+    Parameters:
+    - dataset: customers, products, suppliers or countries
+    - points: feature vectors, as objects keyed by feature name or as lists in feature order
+    
+    Returns:
+    - Cluster label per point (-1 for noise) and distance to the nearest core sample
+    """
+    try:
+        get_dataset(dataset)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    try:
+        return await run_blocking(assign_points, dataset, db, request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/{dataset}/k-distance.png")
+async def get_k_distance_plot(
+    dataset: str,
+    min_samples: int = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Returns the k-distance graph used for eps selection as a PNG.
+    
+    Parameters:
+    - dataset: customers, products, suppliers or countries
+    - min_samples: k of the k-distance graph
+    
+    Returns:
+    - PNG image, rendered on first request and cached per data version and k
+    """
+    try:
+        spec = get_dataset(dataset)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    try:
+        png = await run_blocking(get_k_distance_png, spec, db, min_samples)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return Response(content=png, media_type="image/png")
+
+@app.get("/api/{dataset}/sweep", response_model=Dict[str, Any])
+async def get_parameter_sweep(
+    dataset: str,
+    eps: str = "0.3:3.0:0.1",
+    min_samples: str = "2,3,4",
+    db: Session = Depends(get_db)
+):
+    """
+    Evaluates DBSCAN over a grid of parameters against one shared radius-neighbors graph.
+    
+    Parameters:
+    - dataset: customers, products, suppliers or countries
+    - eps: 'start:stop:step' range (stop inclusive) or comma-separated values
+    - min_samples: 'start:stop:step' range or comma-separated values
+    
+    Returns:
+    - Cluster count, noise ratio and silhouette score per (eps, min_samples)
+    - 400 when the neighbor graph at the largest eps would exceed SWEEP_MAX_GRAPH_ENTRIES
+    """
+    try:
+        spec = get_dataset(dataset)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    try:
+        return await run_blocking(run_sweep, spec, db, eps, min_samples)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/jobs", response_model=Dict[str, Any], status_code=202)
+async def submit_job(request: JobRequest):
+    """
+    Submits a clustering fit or parameter sweep to run in the background.
+    
+    Parameters:
+    - dataset: customers, products, suppliers or countries
+    - kind: fit (default) or sweep
+    - eps, min_samples: fit parameters, optimized when omitted
+    - eps_grid, min_samples_grid: sweep grids, as for the sweep endpoint
+    
+    Returns:
+    - The queued job; poll /api/jobs/{id} or stream /api/jobs/{id}/events
+    - 429 when JOB_QUEUE_LIMIT jobs are already waiting for a worker
+    """
+    try:
+        return job_manager.submit(request).summary()
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+@app.get("/api/jobs/{job_id}", response_model=Dict[str, Any])
+async def get_job(job_id: str):
+    """
+    Returns a job's status, current stage and, once finished, its result
+    summary (the sweep results for sweeps) or error.
+    """
+    try:
+        return job_manager.get(job_id).summary()
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.get("/api/jobs/{job_id}/result")
+async def get_job_result(job_id: str, options: ResponseOptions = Depends()):
+    """
+    Returns the clustering result of a finished fit job, in any of the
+    formats of the clusters endpoints. 409 while the job has not succeeded.
+    """
+    try:
+        job = job_manager.get(job_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if job.status != 'succeeded' or job.result is None:
+        raise HTTPException(status_code=409, detail=f"Job {job_id} has no clustering result (status: {job.status})")
+    try:
+        return await run_blocking(render_cluster_response, job.result, {'cache': job.cache}, options)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, last_event_id: Optional[int] = Header(None)):
+    """
+    Server-sent events for a job: status changes and the start and end of
+    each pipeline stage. Closes when the job finishes; reconnecting clients
+    resume after Last-Event-ID.
+    """
+    try:
+        job = job_manager.get(job_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return StreamingResponse(job_events(job, last_event_id), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+@app.delete("/api/jobs/{job_id}", response_model=Dict[str, Any])
+async def cancel_job(job_id: str):
+    """
+    Cancels a job. A queued job never starts; a running one stops at its
+    next stage boundary or checkpoint (per sweep grid point, bootstrap
+    round or partitioned chunk) and frees its worker.
+    """
+    try:
+        return job_manager.cancel(job_id).summary()
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
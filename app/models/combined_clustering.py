@@ -0,0 +1,158 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy.orm import Session
+from typing import Dict, Any, List
+import pandas as pd
+from ..core.clustering import ClusterAnalyzer
+from ..core.instrumentation import stage
+from .datasets import DATASETS
+
+
+ORDER_LINES_QUERY = """
+    SELECT
+        o.order_id,
+        o.customer_id,
+        od.product_id,
+        od.quantity,
+        od.unit_price AS line_unit_price
+    FROM orders o
+    LEFT JOIN order_details od ON o.order_id = od.order_id
+"""
+
+CUSTOMERS_QUERY = "SELECT customer_id, country FROM customers"
+
+PRODUCTS_QUERY = """
+    SELECT product_id, supplier_id, category_id, unit_price,
+           units_in_stock, units_on_order, reorder_level
+    FROM products
+"""
+
+SUPPLIERS_QUERY = "SELECT supplier_id FROM suppliers"
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _snapshot_isolation_level(db: Session) -> str:
+    return 'REPEATABLE READ' if db.get_bind().dialect.name == 'postgresql' else 'SERIALIZABLE'
+
+
+def get_order_data(db: Session) -> Dict[str, pd.DataFrame]:
+    """
+    Reads the order-line fact table and the entity tables once, inside a
+    single snapshot, so all four feature frames see the same data.
+    """
+    connection = db.connection(execution_options={'isolation_level': _snapshot_isolation_level(db)})
+    with stage('sql', 'all'):
+        data = {
+            'lines': pd.read_sql(ORDER_LINES_QUERY, connection),
+            'customers': pd.read_sql(CUSTOMERS_QUERY, connection),
+            'products': pd.read_sql(PRODUCTS_QUERY, connection),
+            'suppliers': pd.read_sql(SUPPLIERS_QUERY, connection),
+        }
+    # Matches the SQL joins through customers: orders of unknown customers add no customer
+    lines = data['lines']
+    lines['known_customer_id'] = lines['customer_id'].where(lines['customer_id'].isin(data['customers']['customer_id']))
+    return data
+
+
+def _aggregate_customer_lines(joined: pd.DataFrame, key: str) -> pd.DataFrame:
+    df = joined.groupby(key).agg(
+        order_count=('order_id', 'nunique'),
+        total_quantity=('quantity', 'sum'),
+        avg_unit_price=('line_unit_price', 'mean'),
+        unique_categories=('category_id', 'nunique')
+    ).reset_index()
+    df['total_quantity'] = df['total_quantity'].astype('int64')
+    return df.fillna(0)
+
+
+def derive_customer_features(data: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    lines = data['lines'].merge(data['products'][['product_id', 'category_id']], on='product_id', how='left')
+    joined = data['customers'][['customer_id']].merge(lines, on='customer_id', how='left')
+    return _aggregate_customer_lines(joined, 'customer_id')
+
+
+def derive_country_features(data: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    lines = data['lines'].merge(data['products'][['product_id', 'category_id']], on='product_id', how='left')
+    joined = data['customers'].merge(lines, on='customer_id', how='left')
+    return _aggregate_customer_lines(joined, 'country')
+
+
+def derive_product_features(data: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    products = data['products']
+    joined = products[['product_id']].merge(data['lines'], on='product_id', how='left')
+    aggregates = joined.groupby('product_id').agg(
+        order_count=('order_id', 'nunique'),
+        total_quantity=('quantity', 'sum'),
+        unique_customers=('known_customer_id', 'nunique')
+    )
+    aggregates['total_quantity'] = aggregates['total_quantity'].astype('int64')
+    static = products.set_index('product_id')[['unit_price', 'units_in_stock', 'units_on_order', 'reorder_level']]
+    return static.join(aggregates).sort_index().reset_index().fillna(0)
+
+
+def derive_supplier_features(data: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    # Aggregates over the joined rows, reproducing the fan-out of the SQL query
+    joined = (
+        data['suppliers']
+        .merge(data['products'], on='supplier_id', how='left')
+        .merge(data['lines'][['product_id', 'known_customer_id']], on='product_id', how='left')
+    )
+    df = joined.groupby('supplier_id').agg(
+        product_count=('product_id', 'nunique'),
+        total_stock=('units_in_stock', 'sum'),
+        total_on_order=('units_on_order', 'sum'),
+        avg_product_price=('unit_price', 'mean'),
+        unique_customers=('known_customer_id', 'nunique')
+    ).reset_index()
+    df[['total_stock', 'total_on_order']] = df[['total_stock', 'total_on_order']].astype('int64')
+    return df.fillna(0)
+
+
+FEATURE_DERIVATIONS = {
+    'customers': derive_customer_features,
+    'products': derive_product_features,
+    'suppliers': derive_supplier_features,
+    'countries': derive_country_features,
+}
+
+
+def _analyze(feature_columns: List[str], name: str, df: pd.DataFrame) -> Dict[str, Any]:
+    analyzer = ClusterAnalyzer(feature_columns=feature_columns, name=name)
+    return analyzer.analyze(df)
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn avoids forking a threaded server with live BLAS/OpenMP pools
+            _executor = ProcessPoolExecutor(
+                max_workers=min(len(FEATURE_DERIVATIONS), os.cpu_count() or 1),
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _executor
+
+
+def shutdown_executor(wait: bool = False) -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait, cancel_futures=True)
+        _executor = None
+
+
+def analyze_all_clusters(db: Session) -> Dict[str, Any]:
+    data = get_order_data(db)
+    with stage('derive', 'all'):
+        frames = {dataset: derive(data) for dataset, derive in FEATURE_DERIVATIONS.items()}
+    executor = _get_executor()
+    with stage('fit', 'all'):
+        futures = {
+            dataset: executor.submit(_analyze, DATASETS[dataset].feature_columns, DATASETS[dataset].name, df)
+            for dataset, df in frames.items()
+        }
+        return {dataset: future.result() for dataset, future in futures.items()}
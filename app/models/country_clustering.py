@@ -21,7 +21,7 @@ def get_country_features(db: Session):
         LEFT JOIN products p ON od.product_id = p.product_id
         GROUP BY c.country
     """
-    preprocessor = DataPreprocessor(db)
+    preprocessor = DataPreprocessor(db, name='country')
     return preprocessor.load_and_clean(query)
 
 
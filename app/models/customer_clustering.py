@@ -21,7 +21,7 @@ def get_customer_features(db: Session):
         LEFT JOIN products p ON od.product_id = p.product_id
         GROUP BY c.customer_id
     """
-    preprocessor = DataPreprocessor(db)
+    preprocessor = DataPreprocessor(db, name='customer')
     return preprocessor.load_and_clean(query)
 
 
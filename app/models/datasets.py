@@ -0,0 +1,121 @@
+import os
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from typing import Callable, Dict, Any, List, NamedTuple
+import pandas as pd
+from ..core.clustering import ClusterAnalyzer
+from ..core.preprocessing import DataPreprocessor, write_feature_snapshot, read_feature_snapshot_metadata
+from .customer_clustering import CUSTOMER_FEATURES, get_customer_features, analyze_customer_clusters
+from .product_clustering import PRODUCT_FEATURES, get_product_features, analyze_product_clusters
+from .supplier_clustering import SUPPLIER_FEATURES, get_supplier_features, analyze_supplier_clusters
+from .country_clustering import COUNTRY_FEATURES, get_country_features, analyze_country_clusters
+
+
+class DatasetSpec(NamedTuple):
+    name: str
+    feature_columns: List[str]
+    get_features: Callable[[Session], pd.DataFrame]
+    analyze: Callable[..., Dict[str, Any]]
+
+    def analyzer(self, backend=None, compact: bool = None) -> ClusterAnalyzer:
+        return ClusterAnalyzer(feature_columns=self.feature_columns, name=self.name, backend=backend, compact=compact)
+
+    def load(self, db: Session) -> pd.DataFrame:
+        """
+        Loads the feature frame from the configured FEATURE_SOURCE: 'sql'
+        (default, the full aggregate query), 'incremental' (the
+        order_id-watermarked feature store) or 'snapshot' (the Parquet
+        export under FEATURE_SNAPSHOT_DIR).
+        """
+        source = os.getenv("FEATURE_SOURCE", "sql")
+        if source == "incremental":
+            from .feature_store import feature_store
+            return feature_store.features(self.name, db)
+        if source == "snapshot":
+            return self.load_snapshot()
+        return self.get_features(db)
+
+    def load_window(self, db: Session, start=None, end=None, refresh: bool = True) -> pd.DataFrame:
+        """
+        Loads the feature frame over orders dated in [start, end], merged from
+        daily partials. refresh=False reads them as they are, for callers that
+        have just refreshed them.
+        """
+        from .feature_store import daily_partials
+        return daily_partials.features(self.name, db, start, end, refresh)
+
+    def snapshot_path(self, directory: str = None) -> str:
+        return os.path.join(directory or os.getenv("FEATURE_SNAPSHOT_DIR", "feature_snapshots"), f'{self.name}.parquet')
+
+    def load_snapshot(self, directory: str = None, columns: List[str] = None) -> pd.DataFrame:
+        return DataPreprocessor(name=self.name).load_snapshot(self.snapshot_path(directory), columns)
+
+    def data_version(self, db: Session) -> str:
+        """Version of the data load() returns; with snapshots it comes from the file, not the database."""
+        if os.getenv("FEATURE_SOURCE", "sql") == "snapshot":
+            path = self.snapshot_path()
+            info = read_feature_snapshot_metadata(path)
+            return f"snapshot:{info['data_version']}:{os.stat(path).st_mtime_ns}"
+        return get_data_version(db)
+
+
+DATASETS: Dict[str, DatasetSpec] = {
+    'customers': DatasetSpec('customer', CUSTOMER_FEATURES, get_customer_features, analyze_customer_clusters),
+    'products': DatasetSpec('product', PRODUCT_FEATURES, get_product_features, analyze_product_clusters),
+    'suppliers': DatasetSpec('supplier', SUPPLIER_FEATURES, get_supplier_features, analyze_supplier_clusters),
+    'countries': DatasetSpec('country', COUNTRY_FEATURES, get_country_features, analyze_country_clusters),
+}
+
+
+def get_dataset(dataset: str) -> DatasetSpec:
+    if dataset not in DATASETS:
+        raise KeyError(f"Unknown dataset '{dataset}'. Expected one of: {', '.join(DATASETS)}")
+    return DATASETS[dataset]
+
+
+DATA_VERSION_QUERY = """
+    SELECT
+        (SELECT MAX(order_id) FROM orders),
+        (SELECT COUNT(*) FROM orders),
+        (SELECT COUNT(*) FROM order_details),
+        (SELECT COUNT(*) FROM customers),
+        (SELECT COUNT(*) FROM suppliers),
+        (SELECT COUNT(*) FROM products),
+        (SELECT COALESCE(SUM(units_in_stock), 0) FROM products),
+        (SELECT COALESCE(SUM(units_on_order), 0) FROM products),
+        (SELECT COALESCE(SUM(reorder_level), 0) FROM products),
+        (SELECT COALESCE(SUM(unit_price), 0) FROM products)
+"""
+
+
+def get_data_version(db: Session) -> str:
+    """
+    Cheap watermark of the tables behind the feature queries. It changes when
+    orders arrive or product stock and prices are updated.
+    """
+    row = db.execute(text(DATA_VERSION_QUERY)).one()
+    return ':'.join(str(value) for value in row)
+
+
+def load_features(dataset: str, db: Session = None, snapshot_dir: str = None, columns: List[str] = None) -> pd.DataFrame:
+    """Reads a feature frame from a Parquet snapshot directory when one is given, otherwise from the database."""
+    spec = get_dataset(dataset)
+    if snapshot_dir:
+        return spec.load_snapshot(snapshot_dir, columns)
+    df = spec.get_features(db)
+    return df[columns] if columns else df
+
+
+def export_feature_snapshots(db: Session, directory: str = None, datasets: List[str] = None) -> Dict[str, str]:
+    """Exports feature frames to Parquet snapshots and returns their paths by dataset."""
+    version = get_data_version(db)
+    paths = {}
+    for dataset in datasets or list(DATASETS):
+        spec = get_dataset(dataset)
+        path = spec.snapshot_path(directory)
+        write_feature_snapshot(
+            spec.get_features(db), path,
+            dataset=dataset, feature_columns=spec.feature_columns, data_version=version
+        )
+        paths[dataset] = path
+    return paths
@@ -0,0 +1,369 @@
+import threading
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from ..core.instrumentation import stage
+from .combined_clustering import ORDER_LINES_QUERY, CUSTOMERS_QUERY, PRODUCTS_QUERY, SUPPLIERS_QUERY
+
+
+NEW_ORDER_LINES_QUERY = ORDER_LINES_QUERY + "    WHERE o.order_id > :watermark\n"
+
+DAILY_ORDER_LINES_QUERY = """
+    SELECT
+        o.order_id,
+        o.customer_id,
+        o.order_date,
+        od.product_id,
+        od.quantity,
+        od.unit_price AS line_unit_price
+    FROM orders o
+    LEFT JOIN order_details od ON o.order_id = od.order_id
+    WHERE o.order_id > :watermark
+"""
+
+
+def _sum_partials(frame: pd.DataFrame) -> pd.DataFrame:
+    return frame.groupby(level=list(range(frame.index.nlevels))).sum()
+
+
+def _distinct(frame: pd.DataFrame) -> pd.DataFrame:
+    return frame.drop_duplicates(ignore_index=True)
+
+
+class PartialLog:
+    """
+    Partial aggregates kept as the batches that produced them. A refresh
+    appends its batch, so it costs the same however long the history is;
+    the next read folds the pending batches into the rest with reduce and
+    keeps the result for later reads.
+    """
+
+    def __init__(self, empty: pd.DataFrame, reduce: Callable[[pd.DataFrame], pd.DataFrame]):
+        self._empty = empty
+        self._reduce = reduce
+        self._batches: List[pd.DataFrame] = []
+
+    def append(self, batch: pd.DataFrame) -> None:
+        if not batch.empty:
+            self._batches.append(batch)
+
+    def frame(self) -> pd.DataFrame:
+        if not self._batches:
+            return self._empty
+        if len(self._batches) > 1:
+            self._batches = [self._reduce(pd.concat(self._batches))]
+        return self._batches[0]
+
+
+def _count_distinct(pairs: pd.DataFrame, key, member: str) -> pd.Series:
+    """Distinct members per key; key is a column of pairs or a Series aligned with it."""
+    key = pairs[key] if isinstance(key, str) else key
+    members = pairs[member]
+    distinct = pd.DataFrame({'key': key.to_numpy(), 'member': members.to_numpy()}).dropna().drop_duplicates()
+    return distinct.groupby('key').size()
+
+
+def _known_customers(lines: pd.DataFrame, entities: Dict[str, pd.DataFrame]) -> np.ndarray:
+    # A hash lookup of the batch; Series.isin on string columns walks every customer in Python
+    return pd.Index(entities['customers']['customer_id']).get_indexer(lines['customer_id']) >= 0
+
+
+def _read_batch(db: Session, query: str, watermark: int) -> Tuple[Dict[str, pd.DataFrame], pd.DataFrame]:
+    """Reads the entity tables and the order lines past the watermark."""
+    connection = db.connection()
+    with stage('sql', 'feature_store'):
+        entities = {
+            'customers': pd.read_sql(CUSTOMERS_QUERY, connection),
+            'products': pd.read_sql(PRODUCTS_QUERY, connection),
+            'suppliers': pd.read_sql(SUPPLIERS_QUERY, connection),
+        }
+        lines = pd.read_sql(text(query), connection, params={'watermark': watermark})
+    return entities, lines
+
+
+class AggregateFrames:
+    """
+    Builds the four feature frames from per-entity aggregates: order and
+    line sums per customer and per product, the distinct (customer_id,
+    category_id) and (product_id, customer_id) pairs, plus the current
+    entity tables.
+    """
+
+    def __init__(self, entities: Dict[str, pd.DataFrame], customer_sums: pd.DataFrame,
+                 customer_categories: pd.DataFrame, product_sums: pd.DataFrame, product_customers: pd.DataFrame):
+        self.entities = entities
+        self.customer_sums = customer_sums
+        self.customer_categories = customer_categories
+        self.product_sums = product_sums
+        self.product_customers = product_customers
+
+    def customer_features(self) -> pd.DataFrame:
+        customers = self.entities['customers'][['customer_id']].sort_values('customer_id')
+        categories = _count_distinct(self.customer_categories, 'customer_id', 'category_id')
+        return self._customer_frame(customers.set_index('customer_id').index, self.customer_sums, categories, 'customer_id')
+
+    def country_features(self) -> pd.DataFrame:
+        countries = self.entities['customers'].set_index('customer_id')['country']
+        sums = self.customer_sums.groupby(countries.reindex(self.customer_sums.index)).sum()
+        categories = _count_distinct(self.customer_categories, self.customer_categories['customer_id'].map(countries), 'category_id')
+        return self._customer_frame(pd.Index(sorted(countries.dropna().unique()), name='country'), sums, categories, 'country')
+
+    @staticmethod
+    def _customer_frame(index: pd.Index, sums: pd.DataFrame, categories: pd.Series, key: str) -> pd.DataFrame:
+        sums = sums.reindex(index, fill_value=0)
+        price_count = sums['price_count'].replace(0, np.nan)
+        df = pd.DataFrame({
+            'order_count': sums['order_count'].astype('int64'),
+            'total_quantity': sums['total_quantity'].astype('int64'),
+            'avg_unit_price': (sums['price_sum'] / price_count).fillna(0),
+            'unique_categories': categories.reindex(index, fill_value=0).astype('int64'),
+        }, index=index)
+        return df.rename_axis(key).reset_index()
+
+    def product_features(self) -> pd.DataFrame:
+        products = self.entities['products'].set_index('product_id').sort_index()
+        sums = self.product_sums.reindex(products.index, fill_value=0)
+        df = products[['unit_price', 'units_in_stock', 'units_on_order', 'reorder_level']].copy()
+        df['order_count'] = sums['order_count'].astype('int64')
+        df['total_quantity'] = sums['total_quantity'].astype('int64')
+        customers = _count_distinct(self.product_customers, 'product_id', 'customer_id')
+        df['unique_customers'] = customers.reindex(products.index, fill_value=0).astype('int64')
+        return df.reset_index().fillna(0)
+
+    def supplier_features(self) -> pd.DataFrame:
+        products = self.entities['products'].set_index('product_id')
+        # The supplier query sums product columns over every joined order line,
+        # so each product is weighted by its line count (at least one row)
+        weight = self.product_sums['line_count'].reindex(products.index, fill_value=0).clip(lower=1)
+        priced = products['unit_price'].notna()
+        weighted = pd.DataFrame({
+            'supplier_id': products['supplier_id'],
+            'product_count': 1,
+            'total_stock': products['units_in_stock'].fillna(0) * weight,
+            'total_on_order': products['units_on_order'].fillna(0) * weight,
+            'price_sum': products['unit_price'].fillna(0) * weight,
+            'price_count': weight.where(priced, 0),
+        })
+        sums = weighted.groupby('supplier_id').sum()
+        customers = _count_distinct(self.product_customers, self.product_customers['product_id'].map(products['supplier_id']), 'customer_id')
+
+        index = pd.Index(sorted(self.entities['suppliers']['supplier_id']), name='supplier_id')
+        sums = sums.reindex(index, fill_value=0)
+        df = pd.DataFrame({
+            'product_count': sums['product_count'].astype('int64'),
+            'total_stock': sums['total_stock'].astype('int64'),
+            'total_on_order': sums['total_on_order'].astype('int64'),
+            'avg_product_price': (sums['price_sum'] / sums['price_count'].replace(0, np.nan)).fillna(0),
+            'unique_customers': customers.reindex(index, fill_value=0).astype('int64'),
+        }, index=index)
+        return df.reset_index()
+
+    def frame(self, name: str) -> pd.DataFrame:
+        """Feature frame for a dataset name."""
+        return {
+            'customer': self.customer_features,
+            'product': self.product_features,
+            'supplier': self.supplier_features,
+            'country': self.country_features,
+        }[name]()
+
+
+CUSTOMER_SUMS = ['order_count', 'total_quantity', 'price_sum', 'price_count']
+PRODUCT_SUMS = ['order_count', 'total_quantity', 'line_count']
+
+
+class IncrementalFeatureStore:
+    """
+    Running per-entity aggregates behind the four feature frames.
+
+    Every refresh applies only the order lines whose order_id is past the
+    last processed watermark. The entity tables themselves are small and are
+    re-read each time, so stock and price updates are picked up. Averages
+    are kept as sum and count. Distinct sets (categories per customer,
+    customers per product) are kept as the distinct pairs themselves, so
+    they take memory per pair seen rather than per possible member.
+
+    A refresh only appends the aggregates of its batch; the first read
+    after it folds them into the running totals (see PartialLog).
+
+    Orders inserted below the watermark, or lines added to an already
+    processed order, are not seen; call rebuild() after such backfills.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rebuild()
+
+    def rebuild(self) -> None:
+        self.watermark = 0
+        self.customer_sums = PartialLog(pd.DataFrame(columns=CUSTOMER_SUMS, dtype='float64'), _sum_partials)
+        self.customer_categories = PartialLog(pd.DataFrame(columns=['customer_id', 'category_id']), _distinct)
+        self.product_sums = PartialLog(pd.DataFrame(columns=PRODUCT_SUMS, dtype='float64'), _sum_partials)
+        self.product_customers = PartialLog(pd.DataFrame(columns=['product_id', 'customer_id']), _distinct)
+        self.entities: Optional[Dict[str, pd.DataFrame]] = None
+
+    def _apply(self, lines: pd.DataFrame, entities: Dict[str, pd.DataFrame]) -> None:
+        lines = lines.merge(entities['products'][['product_id', 'category_id']], on='product_id', how='left')
+        known = _known_customers(lines, entities)
+
+        customer_lines = lines[known]
+        self.customer_sums.append(customer_lines.groupby('customer_id').agg(
+            order_count=('order_id', 'nunique'),
+            total_quantity=('quantity', 'sum'),
+            price_sum=('line_unit_price', 'sum'),
+            price_count=('line_unit_price', 'count')
+        ))
+        self.customer_categories.append(_distinct(customer_lines[['customer_id', 'category_id']].dropna()))
+
+        product_lines = lines.dropna(subset=['product_id']).assign(customer_id=lines['customer_id'].where(known))
+        self.product_sums.append(product_lines.groupby('product_id').agg(
+            order_count=('order_id', 'nunique'),
+            total_quantity=('quantity', 'sum'),
+            line_count=('order_id', 'size')
+        ))
+        self.product_customers.append(_distinct(product_lines[['product_id', 'customer_id']].dropna()))
+
+    def refresh(self, db: Session) -> int:
+        """Applies order lines past the watermark and returns how many were processed."""
+        with self._lock:
+            entities, lines = _read_batch(db, NEW_ORDER_LINES_QUERY, self.watermark)
+            with stage('apply', 'feature_store'):
+                if not lines.empty:
+                    self._apply(lines, entities)
+                    self.watermark = int(lines['order_id'].max())
+                self.entities = entities
+            return len(lines)
+
+    def frames(self) -> AggregateFrames:
+        with self._lock:
+            return AggregateFrames(
+                self.entities,
+                self.customer_sums.frame(),
+                self.customer_categories.frame(),
+                self.product_sums.frame(),
+                self.product_customers.frame(),
+            )
+
+    def frame(self, name: str) -> pd.DataFrame:
+        """Feature frame for a dataset name, from the aggregates applied so far."""
+        return self.frames().frame(name)
+
+    def features(self, name: str, db: Session) -> pd.DataFrame:
+        """Refreshes from new orders and returns the feature frame for a dataset name."""
+        self.refresh(db)
+        return self.frame(name)
+
+
+class DailyPartialStore:
+    """
+    The aggregates of IncrementalFeatureStore, partitioned by entity and
+    order day, so features can be assembled for any date window.
+
+    Each (entity, day) row holds that day's sums, and the distinct sets are
+    kept as (entity, day, member) rows. An order falls on a single day, so
+    distinct order counts add up across days as well. A window sums the
+    partials of its days and counts the distinct members of their rows; no
+    order lines are re-read. Refreshes apply only order lines past the
+    order_id watermark and, as in IncrementalFeatureStore, only append
+    their batch. Orders without an order_date belong to no window.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rebuild()
+
+    def rebuild(self) -> None:
+        self.watermark = 0
+        self.first_day: Optional[pd.Timestamp] = None
+        self.last_day: Optional[pd.Timestamp] = None
+        self.customer_days = PartialLog(pd.DataFrame(columns=CUSTOMER_SUMS, dtype='float64'), _sum_partials)
+        self.customer_day_categories = PartialLog(pd.DataFrame(columns=['customer_id', 'day', 'category_id']), _distinct)
+        self.product_days = PartialLog(pd.DataFrame(columns=PRODUCT_SUMS, dtype='float64'), _sum_partials)
+        self.product_day_customers = PartialLog(pd.DataFrame(columns=['product_id', 'day', 'customer_id']), _distinct)
+        self.entities: Optional[Dict[str, pd.DataFrame]] = None
+
+    def _apply(self, lines: pd.DataFrame, entities: Dict[str, pd.DataFrame]) -> None:
+        lines = lines.assign(day=pd.to_datetime(lines['order_date']).dt.normalize()).dropna(subset=['day'])
+        lines = lines.merge(entities['products'][['product_id', 'category_id']], on='product_id', how='left')
+        known = _known_customers(lines, entities)
+
+        customer_lines = lines[known]
+        if not customer_lines.empty:
+            days = customer_lines['day']
+            self.first_day = min(days.min(), self.first_day) if self.first_day is not None else days.min()
+            self.last_day = max(days.max(), self.last_day) if self.last_day is not None else days.max()
+        self.customer_days.append(customer_lines.groupby(['customer_id', 'day']).agg(
+            order_count=('order_id', 'nunique'),
+            total_quantity=('quantity', 'sum'),
+            price_sum=('line_unit_price', 'sum'),
+            price_count=('line_unit_price', 'count')
+        ))
+        self.customer_day_categories.append(_distinct(customer_lines[['customer_id', 'day', 'category_id']].dropna()))
+
+        product_lines = lines.dropna(subset=['product_id']).assign(customer_id=lines['customer_id'].where(known))
+        self.product_days.append(product_lines.groupby(['product_id', 'day']).agg(
+            order_count=('order_id', 'nunique'),
+            total_quantity=('quantity', 'sum'),
+            line_count=('order_id', 'size')
+        ))
+        self.product_day_customers.append(_distinct(product_lines[['product_id', 'day', 'customer_id']].dropna()))
+
+    def refresh(self, db: Session) -> int:
+        """Applies order lines past the watermark and returns how many were processed."""
+        with self._lock:
+            entities, lines = _read_batch(db, DAILY_ORDER_LINES_QUERY, self.watermark)
+            with stage('apply', 'feature_store'):
+                if not lines.empty:
+                    self._apply(lines, entities)
+                    self.watermark = int(lines['order_id'].max())
+                self.entities = entities
+            return len(lines)
+
+    def date_range(self) -> Tuple[Optional[pd.Timestamp], Optional[pd.Timestamp]]:
+        """First and last order day seen so far."""
+        with self._lock:
+            return self.first_day, self.last_day
+
+    def window(self, start=None, end=None) -> AggregateFrames:
+        """Merges the partials of the days in [start, end] (both inclusive, either open)."""
+        def in_window(partials, days):
+            mask = np.ones(len(partials), dtype=bool)
+            if start is not None:
+                mask &= days >= pd.Timestamp(start)
+            if end is not None:
+                mask &= days <= pd.Timestamp(end)
+            return partials[mask]
+
+        def sums(log):
+            partials = log.frame()
+            if partials.empty:
+                return partials
+            return in_window(partials, partials.index.get_level_values('day')).groupby(level=0).sum()
+
+        def pairs(log):
+            partials = log.frame()
+            return in_window(partials, partials['day']).drop(columns='day')
+
+        with self._lock, stage('merge', 'feature_store'):
+            return AggregateFrames(
+                self.entities,
+                sums(self.customer_days),
+                pairs(self.customer_day_categories),
+                sums(self.product_days),
+                pairs(self.product_day_customers),
+            )
+
+    def features(self, name: str, db: Session, start=None, end=None, refresh: bool = True) -> pd.DataFrame:
+        """
+        Returns the feature frame of a dataset name for a date window, first
+        refreshing from new orders unless the caller already has.
+        """
+        if refresh:
+            self.refresh(db)
+        return self.window(start, end).frame(name)
+
+
+feature_store = IncrementalFeatureStore()
+daily_partials = DailyPartialStore()
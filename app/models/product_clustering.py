@@ -27,7 +27,7 @@ def get_product_features(db: Session):
         LEFT JOIN customers c ON o.customer_id = c.customer_id
         GROUP BY p.product_id, p.unit_price, p.units_in_stock, p.units_on_order, p.reorder_level
     """
-    preprocessor = DataPreprocessor(db)
+    preprocessor = DataPreprocessor(db, name='product')
     return preprocessor.load_and_clean(query)
 
 
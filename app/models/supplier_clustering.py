@@ -26,7 +26,7 @@ def get_supplier_features(db: Session):
         LEFT JOIN customers c ON o.customer_id = c.customer_id
         GROUP BY s.supplier_id
     """
-    preprocessor = DataPreprocessor(db)
+    preprocessor = DataPreprocessor(db, name='supplier')
     return preprocessor.load_and_clean(query)
 
 
@@ -0,0 +1,96 @@
+"""
+Batch report of cluster plots for the four datasets.
+
+Clustering results come from get_cluster_results, so with SNAPSHOT_DIR
+set the shared result snapshots are reused instead of refitted. Every
+figure (2D and 3D cluster plots, k-distance graph) renders as a separate
+task in a process pool on matplotlib's Agg backend.
+"""
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy.orm import Session
+from typing import Dict, Any, List, Tuple
+import numpy as np
+from .api.results import get_cluster_results
+from .core.clustering import deduplicate_rows
+from .core.optimization import KDistanceProfile
+from .core.visualization import ClusterVisualizer, DENSITY_THRESHOLD
+from .models.datasets import DATASETS, get_dataset
+
+
+# Features on the x, y (and z) axes of each dataset's cluster plots
+PLOT_AXES: Dict[str, Tuple[str, str, str]] = {
+    'customers': ('order_count', 'total_quantity', 'avg_unit_price'),
+    'products': ('order_count', 'total_quantity', 'unit_price'),
+    'suppliers': ('product_count', 'total_stock', 'avg_product_price'),
+    'countries': ('order_count', 'total_quantity', 'avg_unit_price'),
+}
+
+
+def _init_worker() -> None:
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+def _render_clusters(path: str, points: np.ndarray, labels: np.ndarray, axes: Tuple[str, ...], title: str) -> str:
+    with open(path, 'wb') as f:
+        f.write(ClusterVisualizer.render_clusters(points, labels, axes, title))
+    return path
+
+
+def _render_k_distance(path: str, scaled_features: np.ndarray, name: str, min_samples: int) -> str:
+    # Duplicate rows share one neighbor query, weighted by their count
+    unique, counts, _ = deduplicate_rows(scaled_features)
+    profile = KDistanceProfile.compute(unique, min_samples, counts if len(unique) < len(scaled_features) else None)
+    with open(path, 'wb') as f:
+        f.write(ClusterVisualizer.render_k_distance(profile, name, min_samples))
+    return path
+
+
+def generate_report(db: Session, directory: str, datasets: List[str] = None, workers: int = None) -> Dict[str, Any]:
+    """Renders every figure under directory, writes report.json there and returns its contents."""
+    os.makedirs(directory, exist_ok=True)
+    start = time.perf_counter()
+    context = multiprocessing.get_context('spawn')
+    report: Dict[str, Any] = {'datasets': {}}
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1, mp_context=context,
+                             initializer=_init_worker) as pool:
+        futures = []
+        for dataset in datasets or list(DATASETS):
+            spec = get_dataset(dataset)
+            result, cache = get_cluster_results(dataset, db)
+            axes = PLOT_AXES[dataset]
+            points = result.frame[list(axes)].to_numpy(dtype=np.float64)
+            labels = np.asarray(result.labels)
+            title = f'{spec.name.capitalize()} Clusters'
+
+            figures = {
+                'clusters': pool.submit(_render_clusters, os.path.join(directory, f'{dataset}_clusters.png'),
+                                        points[:, :2], labels, axes[:2], f'{title} by {axes[0]} and {axes[1]}'),
+                'clusters_3d': pool.submit(_render_clusters, os.path.join(directory, f'{dataset}_clusters_3d.png'),
+                                           points, labels, axes, f'{title} by {", ".join(axes)}'),
+                'k_distance': pool.submit(_render_k_distance, os.path.join(directory, f'{dataset}_k_distance.png'),
+                                          np.asarray(result.scaled_features), spec.name, result.params['min_samples']),
+            }
+            futures.append((dataset, figures))
+            report['datasets'][dataset] = {
+                'rows': len(labels),
+                'clusters': int(len(np.unique(labels[labels != -1]))),
+                'outliers': int((labels == -1).sum()),
+                'params': result.params,
+                'source': cache['source'],
+                'rendering': 'density' if len(labels) > DENSITY_THRESHOLD else 'points',
+            }
+
+        for dataset, figures in futures:
+            report['datasets'][dataset]['figures'] = {
+                figure: os.path.basename(future.result()) for figure, future in figures.items()
+            }
+
+    report['seconds'] = round(time.perf_counter() - start, 3)
+    with open(os.path.join(directory, 'report.json'), 'w') as f:
+        json.dump(report, f, indent=2, default=str)
+    return report
@@ -1,3 +0,0 @@
-from .queries import QueryBuilder
-
-__all__ = ['QueryBuilder']
@@ -0,0 +1,97 @@
+"""
+Concurrency benchmark for a running API server.
+
+N clients request a clustering endpoint in parallel while a separate probe
+keeps hitting `/`. Both latency distributions are reported, so a handler
+that blocks the event loop shows up as high probe latency.
+
+    python -m benchmarks.concurrency --url http://localhost:8000 \
+        --path /api/customers/clusters --clients 16 --requests 128
+"""
+import argparse
+import json
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import numpy as np
+
+
+def timed_get(url: str, timeout: float) -> float:
+    start = time.perf_counter()
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    if not latencies:
+        return {'count': 0}
+    values = np.array(latencies) * 1000
+    return {
+        'count': len(values),
+        'p50_ms': round(float(np.percentile(values, 50)), 2),
+        'p90_ms': round(float(np.percentile(values, 90)), 2),
+        'p99_ms': round(float(np.percentile(values, 99)), 2),
+        'max_ms': round(float(values.max()), 2),
+    }
+
+
+def run(url: str, path: str, clients: int, requests: int, timeout: float = 300.0) -> Dict[str, object]:
+    target = url.rstrip('/') + path
+    probe_url = url.rstrip('/') + '/'
+    probe_latencies: List[float] = []
+    errors: List[str] = []
+    done = threading.Event()
+
+    def probe() -> None:
+        while not done.is_set():
+            try:
+                probe_latencies.append(timed_get(probe_url, timeout))
+            except Exception as e:
+                errors.append(f"probe: {e}")
+            time.sleep(0.05)
+
+    def request(_: int) -> float:
+        try:
+            return timed_get(target, timeout)
+        except Exception as e:
+            errors.append(str(e))
+            return float('nan')
+
+    prober = threading.Thread(target=probe, daemon=True)
+    prober.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        latencies = [value for value in pool.map(request, range(requests)) if value == value]
+    elapsed = time.perf_counter() - start
+    done.set()
+    prober.join()
+
+    return {
+        'target': target,
+        'clients': clients,
+        'requests': requests,
+        'errors': len(errors),
+        'wall_seconds': round(elapsed, 3),
+        'throughput_rps': round(len(latencies) / elapsed, 2),
+        'endpoint': summarize(latencies),
+        'root_probe': summarize(probe_latencies),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument('--path', default='/api/customers/clusters')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=128)
+    parser.add_argument('--timeout', type=float, default=300.0)
+    args = parser.parse_args()
+    print(json.dumps(run(args.url, args.path, args.clients, args.requests, args.timeout), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Import-time budget for the API module.
+
+Imports `app.main` in fresh interpreters with `-X importtime`. Reports the
+best wall time, the slowest modules, and whether any deferred heavy
+dependency was loaded eagerly. Exits non-zero when the budget is exceeded,
+so it can gate CI or worker images.
+
+    python -m benchmarks.import_time --budget-ms 2000
+"""
+import argparse
+import json
+import subprocess
+import sys
+from typing import Dict, List
+
+DEFERRED_MODULES = ('sklearn', 'scipy', 'kneed', 'matplotlib', 'seaborn')
+
+PROBE = (
+    "import sys, time; start = time.perf_counter(); import {module}; "
+    "elapsed = time.perf_counter() - start; "
+    "print(elapsed, ','.join(m for m in {deferred!r} if m in sys.modules))"
+)
+
+
+def measure(module: str = 'app.main', runs: int = 3) -> Dict[str, object]:
+    timings: List[float] = []
+    eager: List[str] = []
+    slowest: List[Dict[str, object]] = []
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', PROBE.format(module=module, deferred=DEFERRED_MODULES)],
+            capture_output=True, text=True, check=True
+        )
+        elapsed, _, loaded = completed.stdout.strip().partition(' ')
+        timings.append(float(elapsed) * 1000)
+        eager = [name for name in loaded.split(',') if name]
+
+        rows = []
+        for line in completed.stderr.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            _, cumulative_us, name = (part.strip() for part in line[len('import time:'):].split('|'))
+            rows.append({'module': name, 'cumulative_ms': round(int(cumulative_us) / 1000, 1)})
+        slowest = sorted((row for row in rows if row['module'].split('.')[0] != module.split('.')[0]),
+                         key=lambda row: row['cumulative_ms'], reverse=True)[:10]
+
+    return {
+        'module': module,
+        'best_ms': round(min(timings), 1),
+        'runs_ms': [round(value, 1) for value in timings],
+        'eager_heavy_imports': eager,
+        'slowest_dependencies': slowest,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', default='app.main')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--budget-ms', type=float, default=2000.0)
+    args = parser.parse_args()
+
+    report = measure(args.module, args.runs)
+    report['budget_ms'] = args.budget_ms
+    report['within_budget'] = report['best_ms'] <= args.budget_ms and not report['eager_heavy_imports']
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if report['within_budget'] else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Peak memory of the clustering pipeline, default versus compact features.
+
+Each dataset is loaded and fitted in a fresh process with tracemalloc
+running, once with float64 features scaled by StandardScaler and once with
+COMPACT_FEATURES (one float32 matrix scaled in place). Reports the traced
+peak while loading the feature frame and, separately, while fitting it,
+plus how many labels differ between the two modes.
+
+    python -m benchmarks.memory --scales 1 10 100 --output memory.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+
+from .suite import database_for, _commit
+
+
+DATASETS = ('customers', 'products', 'suppliers', 'countries')
+MODES = ('default', 'compact')
+
+
+def _run_dataset(database_url: str, dataset: str, compact: bool) -> Dict[str, object]:
+    # Runs in a fresh process, so no allocation from another mode is still cached
+    os.environ['DATABASE_URL'] = database_url
+    from app.database import SessionLocal
+    from app.models.datasets import get_dataset
+
+    # Load the scientific stack before tracing so its import-time allocations are not counted
+    from sklearn.cluster import DBSCAN  # noqa: F401
+    from sklearn.neighbors import NearestNeighbors  # noqa: F401
+    from sklearn.preprocessing import StandardScaler  # noqa: F401
+
+    spec = get_dataset(dataset)
+    db = SessionLocal()
+    try:
+        tracemalloc.start()
+        df = spec.load(db)
+        _, load_peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        result = spec.analyzer(compact=compact).fit(df)
+        wall = time.perf_counter() - start
+        _, fit_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        db.close()
+
+    return {
+        'rows': len(df),
+        'load_peak_bytes': load_peak,
+        'fit_peak_bytes': fit_peak - baseline,
+        'feature_bytes': int(result.scaled_features.nbytes),
+        'wall_seconds': round(wall, 4),
+        'labels': result.labels.tolist(),
+    }
+
+
+def run(scales: List[int], data_dir: str) -> List[Dict[str, object]]:
+    results = []
+    context = multiprocessing.get_context('spawn')
+    for scale in scales:
+        database_url = database_for(scale, data_dir)
+        for dataset in DATASETS:
+            modes = {}
+            for mode in MODES:
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                    modes[mode] = pool.submit(_run_dataset, database_url, dataset, mode == 'compact').result()
+            default, compact = (modes[mode].pop('labels') for mode in MODES)
+            rows = modes['default'].pop('rows')
+            modes['compact'].pop('rows')
+            results.append({
+                'scale': scale,
+                'dataset': dataset,
+                'rows': rows,
+                'modes': modes,
+                'fit_peak_ratio': round(modes['compact']['fit_peak_bytes'] / modes['default']['fit_peak_bytes'], 3)
+                if modes['default']['fit_peak_bytes'] else None,
+                'labels_changed': sum(a != b for a, b in zip(default, compact)),
+            })
+            print(f"scale={scale} {dataset}: fit peak {modes['default']['fit_peak_bytes']} -> "
+                  f"{modes['compact']['fit_peak_bytes']} bytes", file=sys.stderr)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--data-dir', default='benchmark_data')
+    parser.add_argument('--output', default=None, help='Write the JSON report to this file')
+    args = parser.parse_args()
+
+    report = {
+        'mode': 'memory',
+        'commit': _commit(),
+        'python': platform.python_version(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': run(args.scales, args.data_dir),
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
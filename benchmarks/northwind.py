@@ -0,0 +1,138 @@
+"""
+Synthetic Northwind-schema data generator.
+
+Writes the tables the clustering queries read into a SQLite file. At scale
+1 the row counts match the original Northwind: 91 customers, 29 suppliers,
+77 products, 830 orders and about 2,150 order lines. Every other scale
+multiplies these counts, except the 8 categories. The output is
+deterministic for a given scale and seed.
+
+    python -m benchmarks.northwind --scale 100 --out northwind_100x.db
+"""
+import argparse
+import datetime
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+
+BASE_COUNTS = {'customers': 91, 'suppliers': 29, 'products': 77, 'orders': 830}
+N_CATEGORIES = 8
+MAX_LINES_PER_ORDER = 5
+FIRST_ORDER_DATE = datetime.date(1996, 7, 4)
+ORDER_DAYS = 670
+COUNTRIES = [
+    'Argentina', 'Austria', 'Belgium', 'Brazil', 'Canada', 'Denmark', 'Finland', 'France', 'Germany',
+    'Ireland', 'Italy', 'Mexico', 'Norway', 'Poland', 'Portugal', 'Spain', 'Sweden', 'Switzerland',
+    'UK', 'USA', 'Venezuela'
+]
+
+SCHEMA = """
+CREATE TABLE categories (category_id INTEGER PRIMARY KEY, category_name TEXT);
+CREATE TABLE suppliers (supplier_id INTEGER PRIMARY KEY, company_name TEXT, country TEXT);
+CREATE TABLE customers (customer_id TEXT PRIMARY KEY, company_name TEXT, country TEXT);
+CREATE TABLE products (
+    product_id INTEGER PRIMARY KEY, product_name TEXT, supplier_id INTEGER, category_id INTEGER,
+    unit_price REAL, units_in_stock INTEGER, units_on_order INTEGER, reorder_level INTEGER,
+    discontinued INTEGER
+);
+CREATE TABLE orders (order_id INTEGER PRIMARY KEY, customer_id TEXT, order_date TEXT);
+CREATE TABLE order_details (
+    order_id INTEGER, product_id INTEGER, unit_price REAL, quantity INTEGER, discount REAL,
+    PRIMARY KEY (order_id, product_id)
+);
+CREATE INDEX idx_products_supplier ON products (supplier_id);
+CREATE INDEX idx_orders_customer ON orders (customer_id);
+CREATE INDEX idx_order_details_product ON order_details (product_id);
+"""
+
+
+def _popularity(rng: np.random.Generator, n: int) -> np.ndarray:
+    # Heavy-tailed weights, so a few customers and products dominate like in real order data
+    weights = rng.pareto(1.5, n) + 1
+    return weights / weights.sum()
+
+
+def generate(path: str, scale: int = 1, seed: int = 0) -> dict:
+    """Generates the database at path (replacing it) and returns the row counts."""
+    rng = np.random.default_rng(seed)
+    n_customers, n_suppliers, n_products, n_orders = (BASE_COUNTS[t] * scale for t in
+                                                      ('customers', 'suppliers', 'products', 'orders'))
+
+    customer_ids = np.array([f'C{i:06d}' for i in range(n_customers)])
+    customers = pd.DataFrame({
+        'customer_id': customer_ids,
+        'company_name': customer_ids,
+        'country': rng.choice(COUNTRIES, n_customers),
+    })
+    suppliers = pd.DataFrame({
+        'supplier_id': np.arange(1, n_suppliers + 1),
+        'company_name': [f'Supplier {i}' for i in range(1, n_suppliers + 1)],
+        'country': rng.choice(COUNTRIES, n_suppliers),
+    })
+    products = pd.DataFrame({
+        'product_id': np.arange(1, n_products + 1),
+        'product_name': [f'Product {i}' for i in range(1, n_products + 1)],
+        'supplier_id': rng.integers(1, n_suppliers + 1, n_products),
+        'category_id': rng.integers(1, N_CATEGORIES + 1, n_products),
+        'unit_price': np.round(rng.lognormal(3, 0.8, n_products), 2),
+        'units_in_stock': rng.integers(0, 125, n_products),
+        'units_on_order': rng.choice([0, 0, 0, 10, 20, 40, 70], n_products),
+        'reorder_level': rng.choice([0, 5, 10, 15, 20, 25, 30], n_products),
+        'discontinued': (rng.random(n_products) < 0.1).astype(int),
+    })
+
+    # As in Northwind, a couple of customers per 91 never order
+    ordering = customer_ids[:n_customers - 2 * scale]
+    order_ids = np.arange(1, n_orders + 1)
+    order_dates = pd.to_datetime(FIRST_ORDER_DATE) + pd.to_timedelta((order_ids - 1) * ORDER_DAYS // n_orders, unit='D')
+    orders = pd.DataFrame({
+        'order_id': order_ids,
+        'customer_id': rng.choice(ordering, n_orders, p=_popularity(rng, len(ordering))),
+        'order_date': order_dates.strftime('%Y-%m-%d'),
+    })
+
+    lines_per_order = rng.integers(1, MAX_LINES_PER_ORDER + 1, n_orders)
+    order_details = pd.DataFrame({
+        'order_id': np.repeat(order_ids, lines_per_order),
+        'product_id': rng.choice(products['product_id'], lines_per_order.sum(), p=_popularity(rng, n_products)),
+    }).drop_duplicates(['order_id', 'product_id'])
+    prices = products.set_index('product_id')['unit_price']
+    order_details['unit_price'] = prices.loc[order_details['product_id']].to_numpy()
+    order_details['quantity'] = rng.integers(1, 61, len(order_details))
+    order_details['discount'] = rng.choice([0, 0, 0, 0.05, 0.1, 0.15, 0.2, 0.25], len(order_details))
+
+    if os.path.exists(path):
+        os.remove(path)
+    with sqlite3.connect(path) as connection:
+        connection.executescript(SCHEMA)
+        connection.executemany("INSERT INTO categories VALUES (?, ?)",
+                               [(i, f'Category {i}') for i in range(1, N_CATEGORIES + 1)])
+        tables = {
+            'suppliers': suppliers, 'customers': customers, 'products': products,
+            'orders': orders, 'order_details': order_details,
+        }
+        for table, frame in tables.items():
+            placeholders = ', '.join('?' * len(frame.columns))
+            connection.executemany(f"INSERT INTO {table} VALUES ({placeholders})",
+                                   frame.itertuples(index=False, name=None))
+    connection.close()
+    return {table: len(frame) for table, frame in tables.items()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=int, default=1, help='Multiple of the original Northwind row counts')
+    parser.add_argument('--out', default=None, help='SQLite file to write (default northwind_<scale>x.db)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    path = args.out or f'northwind_{args.scale}x.db'
+    counts = generate(path, args.scale, args.seed)
+    print(f"Wrote {path}: " + ', '.join(f'{table}={count}' for table, count in counts.items()))
+
+
+if __name__ == '__main__':
+    main()
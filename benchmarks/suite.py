@@ -0,0 +1,253 @@
+"""
+Reproducible pipeline benchmark on synthetic Northwind data.
+
+The data is generated with `benchmarks.northwind` and kept under
+--data-dir. Both modes take one or more scales and write JSON to --output.
+Pass a previous run's JSON with --compare to get per-path ratios; the run
+exits non-zero when any wall time regresses by more than --tolerance.
+
+analyze: runs each analyze_*_clusters path, plus the combined
+analyze_all_clusters, in a fresh process. It records the best wall time
+of --repeat runs with its per-stage breakdown, peak RSS and rows/sec.
+
+    python -m benchmarks.suite --scales 1 10 100 --output bench.json
+
+http: drives app.main:app in-process through httpx's ASGI transport, with
+concurrent clients, and reports latency percentiles and the mean of every
+Server-Timing stage.
+
+    python -m benchmarks.suite --mode http --scales 10 --clients 8 --requests 64
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from .concurrency import summarize
+from .northwind import generate
+
+
+ANALYZE_PATHS = ('customers', 'products', 'suppliers', 'countries', 'all')
+HTTP_PATHS = ('/api/customers/clusters', '/api/products/clusters', '/api/suppliers/clusters', '/api/countries/clusters')
+
+
+def database_for(scale: int, data_dir: str) -> str:
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.abspath(os.path.join(data_dir, f'northwind_{scale}x.db'))
+    if not os.path.exists(path):
+        generate(path, scale)
+    return f'sqlite:///{path}'
+
+
+def _stage_totals(stages) -> Dict[str, float]:
+    totals: Dict[str, float] = {}
+    for name, seconds in stages:
+        totals[name] = round(totals.get(name, 0.0) + seconds, 4)
+    return totals
+
+
+def _analyze_once(db, path: str) -> int:
+    from app.models.datasets import DATASETS
+
+    if path == 'all':
+        from app.models.combined_clustering import analyze_all_clusters
+        results = analyze_all_clusters(db)
+        return sum(len(results[name][DATASETS[name].name + 's']) for name in results)
+    spec = DATASETS[path]
+    return len(spec.analyze(db)[spec.name + 's'])
+
+
+def _run_path(database_url: str, path: str, repeat: int) -> Dict[str, object]:
+    # Runs in a fresh process, so peak RSS belongs to this path alone
+    os.environ['DATABASE_URL'] = database_url
+    from app.core.instrumentation import start_request_timings
+    from app.database import SessionLocal
+    from app.models.combined_clustering import shutdown_executor
+
+    # The scientific stack loads lazily on first use; keep that one-off cost out of the wall time
+    start = time.perf_counter()
+    from sklearn.cluster import DBSCAN  # noqa: F401
+    from sklearn.neighbors import NearestNeighbors  # noqa: F401
+    from sklearn.preprocessing import StandardScaler  # noqa: F401
+    import_seconds = time.perf_counter() - start
+
+    best = None
+    db = SessionLocal()
+    try:
+        for _ in range(repeat):
+            timings = start_request_timings()
+            start = time.perf_counter()
+            rows = _analyze_once(db, path)
+            wall = time.perf_counter() - start
+            if best is None or wall < best[0]:
+                best = (wall, rows, timings)
+    finally:
+        db.close()
+        shutdown_executor(wait=True)
+    wall, rows, timings = best
+
+    # ru_maxrss is reported in kilobytes on Linux; the combined path fits in child processes
+    peak_rss = max(resource.getrusage(who).ru_maxrss for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)) * 1024
+    return {
+        'path': path,
+        'rows': rows,
+        'wall_seconds': round(wall, 4),
+        'import_seconds': round(import_seconds, 4),
+        'rows_per_second': round(rows / wall, 1) if wall else None,
+        'peak_rss_bytes': peak_rss,
+        'stages': _stage_totals(timings.stages),
+    }
+
+
+def run_analyze(scales: List[int], data_dir: str, repeat: int = 3, paths=ANALYZE_PATHS) -> List[Dict[str, object]]:
+    results = []
+    context = multiprocessing.get_context('spawn')
+    for scale in scales:
+        database_url = database_for(scale, data_dir)
+        for path in paths:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                result = pool.submit(_run_path, database_url, path, repeat).result()
+            results.append({'scale': scale, **result})
+            print(f"scale={scale} {path}: {result['wall_seconds']}s, {result['rows']} rows", file=sys.stderr)
+    return results
+
+
+async def _drive(app, paths, clients: int, requests: int) -> Dict[str, object]:
+    import httpx
+
+    latencies: Dict[str, List[float]] = {path: [] for path in paths}
+    stages: Dict[str, List[float]] = {}
+    errors = 0
+    queue: asyncio.Queue = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(paths[i % len(paths)])
+
+    async def client(http: 'httpx.AsyncClient') -> None:
+        nonlocal errors
+        while not queue.empty():
+            path = queue.get_nowait()
+            start = time.perf_counter()
+            response = await http.get(path)
+            latencies[path].append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+            for entry in response.headers.get('server-timing', '').split(','):
+                name, _, duration = entry.strip().partition(';dur=')
+                if duration:
+                    stages.setdefault(name, []).append(float(duration))
+
+    transport = httpx.ASGITransport(app=app)
+    start = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url='http://benchmark', timeout=None) as http:
+            await asyncio.gather(*(client(http) for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        'clients': clients,
+        'requests': requests,
+        'errors': errors,
+        'wall_seconds': round(elapsed, 3),
+        'throughput_rps': round(requests / elapsed, 2),
+        'endpoints': {path: summarize(values) for path, values in latencies.items()},
+        'stage_mean_ms': {name: round(sum(values) / len(values), 2) for name, values in stages.items()},
+    }
+
+
+def _run_http(database_url: str, paths, clients: int, requests: int) -> Dict[str, object]:
+    os.environ['DATABASE_URL'] = database_url
+    from app.main import app
+    return asyncio.run(_drive(app, list(paths), clients, requests))
+
+
+def run_http(scales: List[int], data_dir: str, clients: int, requests: int, paths=HTTP_PATHS) -> List[Dict[str, object]]:
+    results = []
+    context = multiprocessing.get_context('spawn')
+    for scale in scales:
+        database_url = database_for(scale, data_dir)
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            result = pool.submit(_run_http, database_url, paths, clients, requests).result()
+        results.append({'scale': scale, **result})
+        print(f"scale={scale}: {result['throughput_rps']} req/s, {result['errors']} errors", file=sys.stderr)
+    return results
+
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: Dict[str, object], baseline: Dict[str, object], tolerance: float,
+            min_delta: float = 0.05) -> bool:
+    """
+    Prints wall-time ratios against a baseline run and returns False on a
+    regression. Slowdowns under min_delta seconds are treated as noise.
+    """
+    def key(result):
+        return result['scale'], result.get('path', 'http')
+
+    previous = {key(result): result for result in baseline['results']}
+    ok = True
+    for result in current['results']:
+        before = previous.get(key(result))
+        if before is None:
+            continue
+        ratio = result['wall_seconds'] / before['wall_seconds'] if before['wall_seconds'] else float('inf')
+        regressed = ratio > 1 + tolerance and result['wall_seconds'] - before['wall_seconds'] > min_delta
+        ok = ok and not regressed
+        print(f"scale={key(result)[0]} {key(result)[1]}: {before['wall_seconds']}s -> {result['wall_seconds']}s "
+              f"({ratio:.2f}x){' REGRESSION' if regressed else ''}")
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', choices=('analyze', 'http'), default='analyze')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100, 1000])
+    parser.add_argument('--data-dir', default='benchmark_data')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per path in analyze mode; the fastest is reported')
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=64)
+    parser.add_argument('--output', default=None, help='Write the JSON report to this file')
+    parser.add_argument('--compare', default=None, help='Baseline JSON report to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed wall-time slowdown (0.25 = 25%%)')
+    parser.add_argument('--min-delta', type=float, default=0.05, help='Ignore slowdowns below this many seconds')
+    args = parser.parse_args()
+
+    if args.mode == 'analyze':
+        results = run_analyze(args.scales, args.data_dir, args.repeat)
+    else:
+        results = run_http(args.scales, args.data_dir, args.clients, args.requests)
+
+    report = {
+        'mode': args.mode,
+        'commit': _commit(),
+        'python': platform.python_version(),
+        'cpu_count': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            if not compare(report, json.load(f), args.tolerance, args.min_delta):
+                sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
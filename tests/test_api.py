@@ -0,0 +1,57 @@
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import dispose_engine
+from benchmarks.northwind import generate
+
+
+@pytest.fixture(scope='module')
+def client(tmp_path_factory):
+    path = tmp_path_factory.mktemp('northwind') / 'northwind_1x.db'
+    generate(str(path), 1)
+    monkeypatch = pytest.MonkeyPatch()
+    monkeypatch.setenv('DATABASE_URL', f'sqlite:///{path}')
+    dispose_engine()
+    from app.main import app
+    with TestClient(app) as client:
+        client.database = path
+        yield client
+    dispose_engine()
+    monkeypatch.undo()
+
+
+@pytest.mark.parametrize('query', ['', '?format=xml', '?format=arrow&limit=3'])
+def test_k_distance_plot_ignores_response_options(client, query):
+    response = client.get(f'/api/customers/k-distance.png{query}')
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'image/png'
+
+
+def _stages(response) -> set:
+    return {entry.split(';')[0].strip() for entry in response.headers['server-timing'].split(',')}
+
+
+def test_k_distance_plot_cache_hit_runs_no_feature_query(client):
+    first = client.get('/api/suppliers/k-distance.png?min_samples=3')
+    second = client.get('/api/suppliers/k-distance.png?min_samples=3')
+    assert second.content == first.content
+    assert 'sql' not in _stages(second) and 'k_distance' not in _stages(second)
+
+    with sqlite3.connect(client.database) as connection:
+        connection.execute("UPDATE products SET units_in_stock = units_in_stock + 1 WHERE product_id = 1")
+    connection.close()
+    assert {'sql', 'k_distance'} <= _stages(client.get('/api/suppliers/k-distance.png?min_samples=3'))
+
+
+def test_rolling_windows_refresh_the_daily_partials_once(client, monkeypatch):
+    from app.models.feature_store import daily_partials
+    calls = []
+    refresh = daily_partials.refresh
+    monkeypatch.setattr(daily_partials, 'refresh', lambda db: calls.append(db) or refresh(db))
+
+    response = client.get('/api/customers/clusters?window=90')
+    assert response.status_code == 200
+    assert len(response.json()['windows']) > 1
+    assert len(calls) == 1
@@ -0,0 +1,15 @@
+import numpy as np
+import pandas as pd
+
+from app.core.clustering import ClusterAnalyzer
+
+
+def test_result_keeps_no_serialized_records():
+    df = pd.DataFrame(np.random.default_rng(0).normal(size=(200, 2)), columns=['a', 'b'])
+    result = ClusterAnalyzer(['a', 'b'], 'probe').fit(df)
+
+    # Results live in shared caches; serializing one must not attach per-row dicts to it
+    state = {name: id(value) for name, value in vars(result).items()}
+    first, second = result.to_dict(), result.to_dict()
+    assert first['probes'] == second['probes'] and first['probes'] is not second['probes']
+    assert {name: id(value) for name, value in vars(result).items()} == state
@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.models.datasets import DATASETS
+from app.models.feature_store import DailyPartialStore, IncrementalFeatureStore, PartialLog, _distinct
+from benchmarks.northwind import generate
+
+
+# Scale 12 has 1,092 customers, past the 1024 that overflowed the earlier bitmap sets
+SCALE = 12
+
+
+@pytest.fixture(scope='module')
+def engine(tmp_path_factory):
+    path = tmp_path_factory.mktemp('northwind') / f'northwind_{SCALE}x.db'
+    generate(str(path), SCALE)
+    engine = create_engine(f'sqlite:///{path}')
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    # Each test runs in a transaction that is rolled back, so inserted orders do not leak
+    connection = engine.connect()
+    transaction = connection.begin()
+    session = Session(bind=connection)
+    yield session
+    session.close()
+    transaction.rollback()
+    connection.close()
+
+
+def _insert_order(db: Session, customer_id: str, order_date: str = '1998-05-06') -> None:
+    order_id = db.execute(text("SELECT MAX(order_id) + 1 FROM orders")).scalar()
+    db.execute(text("INSERT INTO orders VALUES (:order_id, :customer_id, :order_date)"),
+               {'order_id': order_id, 'customer_id': customer_id, 'order_date': order_date})
+    db.execute(text("INSERT INTO order_details VALUES (:order_id, 1, 18.0, 12, 0)"), {'order_id': order_id})
+
+
+def _assert_matches_sql(db: Session, frame_for) -> None:
+    for dataset, spec in DATASETS.items():
+        expected = spec.get_features(db)
+        actual = frame_for(spec.name)
+        pd.testing.assert_frame_equal(actual[expected.columns].reset_index(drop=True), expected,
+                                      check_dtype=False, obj=dataset)
+
+
+def test_partial_log_folds_pending_batches_on_read():
+    log = PartialLog(pd.DataFrame(columns=['key', 'member']), _distinct)
+    assert log.frame().empty
+    log.append(pd.DataFrame({'key': ['a', 'a'], 'member': [1, 2]}))
+    log.append(pd.DataFrame({'key': ['a', 'b'], 'member': [2, 2]}))
+    log.append(pd.DataFrame(columns=['key', 'member']))
+    assert len(log._batches) == 2
+
+    assert log.frame().values.tolist() == [['a', 1], ['a', 2], ['b', 2]]
+    assert len(log._batches) == 1
+
+
+def _last_customer(db: Session) -> str:
+    return db.execute(text("SELECT MAX(customer_id) FROM customers")).scalar()
+
+
+def test_incremental_store_matches_sql(db):
+    store = IncrementalFeatureStore()
+    store.refresh(db)
+    assert len(store.entities['customers']) > 1024
+    _assert_matches_sql(db, store.frame)
+
+
+def test_incremental_refresh_with_one_new_order(db):
+    store = IncrementalFeatureStore()
+    store.refresh(db)
+    store.frame('customer')
+    batches = len(store.product_customers._batches)
+
+    _insert_order(db, _last_customer(db))
+    assert store.refresh(db) == 1
+    # The refresh only appends the batch; the read folds it in
+    assert len(store.product_customers._batches) == batches + 1
+    _assert_matches_sql(db, store.frame)
+
+
+def test_daily_partials_refresh_with_one_new_order(db):
+    store = DailyPartialStore()
+    store.refresh(db)
+    last = _last_customer(db)
+
+    _insert_order(db, last)
+    assert store.refresh(db) == 1
+    _assert_matches_sql(db, store.window().frame)
+    window = store.window('1998-05-06', '1998-05-06').frame('customer').set_index('customer_id')
+    assert window.loc[last, 'order_count'] >= 1
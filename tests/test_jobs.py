@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from app.api.jobs import Job, JobCancelled, JobRequest
+from app.core.backends import PartitionedDBSCAN
+from app.core.instrumentation import reset_stage_listener, set_stage_listener
+from app.core.optimization import ParameterOptimizer
+
+
+@pytest.fixture
+def job():
+    job = Job(JobRequest(dataset='products', kind='sweep'))
+    token = set_stage_listener(job.on_stage)
+    yield job
+    reset_stage_listener(token)
+
+
+def _cancel_after(job: Job, checks: int):
+    # Requests cancellation from inside the pipeline after a number of checkpoints
+    seen = []
+    on_stage = job.on_stage
+
+    def listener(name, phase):
+        if phase == 'check':
+            seen.append(name)
+            job.cancel_requested = len(seen) >= checks
+        on_stage(name, phase)
+
+    set_stage_listener(listener)
+    return seen
+
+
+def test_sweep_stops_at_the_next_grid_point(job):
+    features = np.random.default_rng(0).normal(size=(300, 2))
+    seen = _cancel_after(job, 3)
+    with pytest.raises(JobCancelled):
+        ParameterOptimizer.sweep(features, [0.2, 0.4, 0.6, 0.8], [2, 3, 4])
+    assert seen == ['sweep'] * 3
+
+
+def test_partitioned_fit_stops_at_the_next_chunk(job):
+    features = np.random.default_rng(0).normal(size=(300, 2))
+    seen = _cancel_after(job, 2)
+    with pytest.raises(JobCancelled):
+        PartitionedDBSCAN(chunk_size=50).fit(features, 0.3, 4)
+    assert seen == ['dbscan'] * 2
+
+
+def test_checkpoints_emit_no_events(job):
+    before = len(job.events_since(0))
+    job.on_stage('sweep', 'check')
+    assert len(job.events_since(0)) == before
+
+    job.cancel_requested = True
+    with pytest.raises(JobCancelled):
+        job.on_stage('sweep', 'check')
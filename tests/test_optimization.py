@@ -0,0 +1,91 @@
+import subprocess
+import sys
+import warnings
+
+import numpy as np
+import pytest
+from sklearn.cluster import DBSCAN
+from sklearn.neighbors import NearestNeighbors
+
+from app.core import optimization
+from app.core.optimization import KDistanceProfile, ParameterOptimizer, _kneedle
+
+
+def _scaled(points: np.ndarray) -> np.ndarray:
+    return (points - points.mean(axis=0)) / points.std(axis=0)
+
+
+SCENARIOS = {
+    'gaussian': lambda rng: rng.normal(size=(20000, 4)),
+    'two_blobs': lambda rng: np.vstack([rng.normal(0, 1, (10000, 3)), rng.normal(6, 0.5, (10000, 3))]),
+    'outliers': lambda rng: np.vstack([rng.normal(size=(19500, 4)), rng.uniform(-40, 40, (500, 4))]),
+}
+
+
+def test_exact_eps_uses_the_full_curve_by_default():
+    from kneed import KneeLocator
+    rng = np.random.default_rng(3)
+    features = _scaled(np.vstack([rng.normal(size=(1950, 4)), rng.uniform(-40, 40, (50, 4))]))
+    curve = np.sort(KDistanceProfile.compute(features, 4).distances[:, 3])
+    knee = KneeLocator(range(1, len(curve) + 1), curve, curve='convex', direction='increasing').knee
+
+    assert KDistanceProfile.compute(features, 4).eps(4) == curve[knee]
+
+
+@pytest.mark.parametrize('scenario', SCENARIOS)
+def test_sampled_eps_targets_the_trimmed_exact_eps(scenario, monkeypatch):
+    monkeypatch.setattr(optimization, 'EPS_KNEE_CURVE', 'trimmed')
+    features = _scaled(SCENARIOS[scenario](np.random.default_rng(1)))
+    exact = KDistanceProfile.compute(features, 4).eps(4)
+    estimate = ParameterOptimizer.estimate_eps(features, 4, sample_size=5000)
+
+    assert estimate['ci'][0] <= exact <= estimate['ci'][1]
+    assert estimate['eps'] == pytest.approx(exact, rel=0.15)
+
+
+def test_sweep_reuses_the_sorted_graph():
+    features = _scaled(np.random.default_rng(2).normal(size=(1500, 3)))
+    with warnings.catch_warnings():
+        # An unsorted precomputed graph makes sklearn warn and re-sort it on every fit
+        warnings.simplefilter('error')
+        results = ParameterOptimizer.sweep(features, [0.2, 0.35, 0.5], [3, 5])
+
+    for result in results:
+        labels = DBSCAN(eps=result['eps'], min_samples=result['min_samples']).fit_predict(features)
+        assert result['n_clusters'] == len(np.unique(labels[labels != -1]))
+        assert result['n_noise'] == int((labels == -1).sum())
+
+
+def test_kneedle_matches_kneed():
+    from kneed import KneeLocator
+    rng = np.random.default_rng(4)
+    for n in rng.integers(2, 400, size=300):
+        # Rounded values give plateaus and ties on the difference curve
+        curve = np.sort(np.round(rng.lognormal(0, rng.uniform(0.2, 2), size=n), 1))
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            expected = KneeLocator(range(1, n + 1), curve, curve='convex', direction='increasing').knee
+        assert _kneedle(curve) == expected
+
+
+def test_fit_never_imports_matplotlib():
+    probe = (
+        "import sys, numpy as np, pandas as pd\n"
+        "from app.core.clustering import ClusterAnalyzer\n"
+        "df = pd.DataFrame(np.random.default_rng(0).normal(size=(300, 2)), columns=['a', 'b'])\n"
+        "ClusterAnalyzer(['a', 'b'], 'probe').fit(df)\n"
+        "print(sorted(m for m in ('kneed', 'matplotlib') if m in sys.modules))\n"
+    )
+    completed = subprocess.run([sys.executable, '-c', probe], capture_output=True, text=True, check=True)
+    assert completed.stdout.strip() == '[]'
+
+
+
+def test_sweep_rejects_a_graph_over_the_limit(monkeypatch):
+    features = _scaled(np.random.default_rng(5).normal(size=(2000, 2)))
+    small, large = (NearestNeighbors(radius=eps).fit(features).radius_neighbors_graph(None).nnz for eps in (0.2, 0.5))
+    monkeypatch.setattr(optimization, 'SWEEP_MAX_GRAPH_ENTRIES', (small + large) // 2)
+
+    with pytest.raises(ValueError, match='lower the largest eps to 0.2 or less'):
+        ParameterOptimizer.sweep(features, [0.2, 0.5], [3])
+    assert len(ParameterOptimizer.sweep(features, [0.1, 0.2], [3])) == 2
@@ -0,0 +1,16 @@
+import pytest
+
+from app.api.responses import ResponseOptions
+from app.api.windows import TimeWindow, get_windowed_cluster_response
+
+
+@pytest.mark.parametrize('options', [
+    ResponseOptions(format='columnar'),
+    ResponseOptions(include_members=False),
+    ResponseOptions(limit=10),
+    ResponseOptions(offset=5),
+])
+def test_rolling_mode_rejects_serialization_options(options):
+    # Rejected before any database access
+    with pytest.raises(ValueError, match='Rolling windows'):
+        get_windowed_cluster_response('customers', None, options=options, time_window=TimeWindow(start=None, end=None, window=30))
@@ -1,73 +1,50 @@
-import matplotlib.pyplot as plt
-import seaborn as sns
-from app.models.customer_clustering import get_customer_features
-from app.models.product_clustering import get_product_features
-from app.models.supplier_clustering import get_supplier_features
-from app.models.country_clustering import get_country_features
+import argparse
+from app.core.visualization import ClusterVisualizer
+from app.models.datasets import get_dataset, load_features
 from app.database import get_db
 
-def plot_customer_clusters():
-    db = next(get_db())
-    try:
-        df = get_customer_features(db)
-        plt.figure(figsize=(12, 8))
-        sns.scatterplot(data=df, x='order_count', y='total_quantity', 
-                       hue='cluster_label', palette='viridis', s=100)
-        plt.title('Customer Clusters by Order Count and Total Quantity')
-        plt.xlabel('Order Count')
-        plt.ylabel('Total Quantity')
-        plt.savefig('customer_clusters.png')
-        plt.close()
-    finally:
-        db.close()
+# For every dataset's figures in parallel, reusing fitted results, see: python -m app.cli report
 
-def plot_product_clusters():
-    db = next(get_db())
+def plot_clusters(dataset, x, y, title, filename, snapshot=None):
+    """
+    Clusters the dataset and saves a scatter plot of two of its features,
+    colored by the fitted cluster labels. Large datasets are drawn as a
+    density plot with outliers marked individually.
+    """
+    db = None if snapshot else next(get_db())
     try:
-        df = get_product_features(db)
-        plt.figure(figsize=(12, 8))
-        sns.scatterplot(data=df, x='order_count', y='total_quantity', 
-                       hue='cluster_label', palette='viridis', s=100)
-        plt.title('Product Clusters by Order Count and Total Quantity')
-        plt.xlabel('Order Count')
-        plt.ylabel('Total Quantity')
-        plt.savefig('product_clusters.png')
-        plt.close()
+        df = load_features(dataset, db, snapshot)
+        result = get_dataset(dataset).analyzer().fit(df)
+        png = ClusterVisualizer.render_clusters(
+            result.frame[[x, y]].to_numpy(dtype=float), result.labels, (x, y), title
+        )
+        with open(filename, 'wb') as f:
+            f.write(png)
     finally:
-        db.close()
+        if db is not None:
+            db.close()
 
-def plot_supplier_clusters():
-    db = next(get_db())
-    try:
-        df = get_supplier_features(db)
-        plt.figure(figsize=(12, 8))
-        sns.scatterplot(data=df, x='product_count', y='total_stock', 
-                       hue='cluster_label', palette='viridis', s=100)
-        plt.title('Supplier Clusters by Product Count and Total Stock')
-        plt.xlabel('Product Count')
-        plt.ylabel('Total Stock')
-        plt.savefig('supplier_clusters.png')
-        plt.close()
-    finally:
-        db.close()
+def plot_customer_clusters(snapshot=None):
+    plot_clusters('customers', 'order_count', 'total_quantity',
+                  'Customer Clusters by Order Count and Total Quantity', 'customer_clusters.png', snapshot)
 
-def plot_country_clusters():
-    db = next(get_db())
-    try:
-        df = get_country_features(db)
-        plt.figure(figsize=(12, 8))
-        sns.scatterplot(data=df, x='order_count', y='total_quantity', 
-                       hue='cluster_label', palette='viridis', s=100)
-        plt.title('Country Clusters by Order Count and Total Quantity')
-        plt.xlabel('Order Count')
-        plt.ylabel('Total Quantity')
-        plt.savefig('country_clusters.png')
-        plt.close()
-    finally:
-        db.close()
+def plot_product_clusters(snapshot=None):
+    plot_clusters('products', 'order_count', 'total_quantity',
+                  'Product Clusters by Order Count and Total Quantity', 'product_clusters.png', snapshot)
+
+def plot_supplier_clusters(snapshot=None):
+    plot_clusters('suppliers', 'product_count', 'total_stock',
+                  'Supplier Clusters by Product Count and Total Stock', 'supplier_clusters.png', snapshot)
+
+def plot_country_clusters(snapshot=None):
+    plot_clusters('countries', 'order_count', 'total_quantity',
+                  'Country Clusters by Order Count and Total Quantity', 'country_clusters.png', snapshot)
 
 if __name__ == "__main__":
-    plot_customer_clusters()
-    plot_product_clusters()
-    plot_supplier_clusters()
-    plot_country_clusters() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Plot cluster scatter plots for every dataset")
+    parser.add_argument('--snapshot', help="Directory of Parquet feature snapshots (python -m app.cli export-features); the database is used when omitted")
+    snapshot = parser.parse_args().snapshot
+    plot_customer_clusters(snapshot)
+    plot_product_clusters(snapshot)
+    plot_supplier_clusters(snapshot)
+    plot_country_clusters(snapshot)
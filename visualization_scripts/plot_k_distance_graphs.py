@@ -1,12 +1,14 @@
+import argparse
 import numpy as np
 from sklearn.neighbors import NearestNeighbors
 from sklearn.preprocessing import StandardScaler
 import matplotlib.pyplot as plt
 from kneed import KneeLocator
-from app.models.customer_clustering import get_customer_features
-from app.models.product_clustering import get_product_features
-from app.models.supplier_clustering import get_supplier_features
-from app.models.country_clustering import get_country_features
+from app.models.customer_clustering import CUSTOMER_FEATURES
+from app.models.product_clustering import PRODUCT_FEATURES
+from app.models.supplier_clustering import SUPPLIER_FEATURES
+from app.models.country_clustering import COUNTRY_FEATURES
+from app.models.datasets import load_features
 from app.database import get_db
 
 def plot_k_distance(features, title, filename, min_samples=2):
@@ -43,32 +45,26 @@ def plot_k_distance(features, title, filename, min_samples=2):
     except Exception as e:
         pass
 
-def main():
-    db = next(get_db())
+def main(snapshot=None):
+    db = None if snapshot else next(get_db())
     try:
-        # Customer data
-        customer_df = get_customer_features(db)
-        customer_features = customer_df[['order_count', 'total_quantity', 'avg_unit_price', 'unique_categories']]
+        # Only the feature columns are read from a snapshot
+        customer_features = load_features('customers', db, snapshot, CUSTOMER_FEATURES)
         plot_k_distance(customer_features, 'K-Distance Graph for Customer Data', 'customer_k_distance.png')
 
-        # Product data
-        product_df = get_product_features(db)
-        product_features = product_df[['unit_price', 'units_in_stock', 'units_on_order', 
-                                     'reorder_level', 'order_count', 'total_quantity', 'avg_discount']]
+        product_features = load_features('products', db, snapshot, PRODUCT_FEATURES)
         plot_k_distance(product_features, 'K-Distance Graph for Product Data', 'product_k_distance.png')
 
-        # Supplier data
-        supplier_df = get_supplier_features(db)
-        supplier_features = supplier_df[['product_count', 'total_stock', 'total_on_order', 
-                                       'avg_product_price', 'unique_customers']]
+        supplier_features = load_features('suppliers', db, snapshot, SUPPLIER_FEATURES)
         plot_k_distance(supplier_features, 'K-Distance Graph for Supplier Data', 'supplier_k_distance.png')
 
-        # Country data
-        country_df = get_country_features(db)
-        country_features = country_df[['order_count', 'total_quantity', 'avg_unit_price', 'unique_categories']]
+        country_features = load_features('countries', db, snapshot, COUNTRY_FEATURES)
         plot_k_distance(country_features, 'K-Distance Graph for Country Data', 'country_k_distance.png')
     finally:
-        db.close()
+        if db is not None:
+            db.close()
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Plot k-distance graphs for every dataset")
+    parser.add_argument('--snapshot', help="Directory of Parquet feature snapshots (python -m app.cli export-features); the database is used when omitted")
+    main(parser.parse_args().snapshot) 
\ No newline at end of file